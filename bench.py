@@ -0,0 +1,267 @@
+"""Headless benchmark for the SmartOps dashboard.
+
+Serves a synthetic floor from dev_server.FloorSimulator, opens a number of
+page sessions against an in-memory Flet connection (no display or client),
+and drives the shared data hub cycle by cycle: tick the floor, poll /data,
+fan the snapshot out, render and flush every session. For each floor size it
+reports:
+
+    latency_ms         poll-to-render time of one cycle (all sessions flushed)
+    alert_ms           data-received to alert-on-screen time, per session, in
+                       cycles where a table started calling
+    summary_ms         one coalesced KPI/chart refresh per session (tier 2,
+                       normally every SUMMARY_REFRESH_INTERVAL, here forced
+                       after every cycle and timed separately)
+    controls_per_cycle Flet controls allocated per session per cycle
+    messages_per_cycle Flet update messages sent per session per cycle
+    bytes_per_cycle    bytes of those messages per session per cycle
+    cpu_ms_per_cycle   process CPU time per session per cycle
+    rss_kb_per_session resident memory added per open session
+    bytes_per_poll     /data bytes on the wire per poll (after compression)
+    decode_ms_per_poll time to inflate and parse one /data body
+
+Wire options can be compared in one run: --formats json columnar picks the
+/data encoding, --encodings identity gzip the compression, and --sync full
+makes every poll fetch the whole document instead of a delta.
+
+Results are written as JSON so runs of different versions can be diffed:
+
+    python bench.py --tables 10 100 1000 --sessions 5 --cycles 30 --output bench.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import warnings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+import flet as ft
+from flet.core.local_connection import LocalConnection
+from flet.core.protocol import ClientActions, ClientMessage, CommandEncoder, PageCommandsBatchResponsePayload
+
+import dev_server
+import main as app
+
+
+class CountingConnection(LocalConnection):
+    """Processes commands like the real socket server, but counts the
+    messages and bytes instead of sending them to a client."""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = 0
+        self.bytes = 0
+
+    def send_command(self, session_id, command):
+        return self.send_commands(session_id, [command])
+
+    def send_commands(self, session_id, commands):
+        results, messages = [], []
+        for command in commands:
+            result, message = self._process_command(command)
+            if command.name in ["add", "get"]:
+                results.append(result)
+            if message:
+                messages.append(message)
+        if messages:
+            payload = json.dumps(ClientMessage(ClientActions.PAGE_CONTROLS_BATCH, messages),
+                                 cls=CommandEncoder, separators=(",", ":"))
+            self.messages += 1
+            self.bytes += len(payload.encode("utf-8"))
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+
+class BenchHub(app.DataHub):
+    async def _run(self):
+        pass  # cycles are driven by the benchmark, not the hub's own loop
+
+
+_allocated = {"controls": 0}
+_control_init = ft.Control.__init__
+
+
+def _counting_init(self, *args, **kwargs):
+    _allocated["controls"] += 1
+    _control_init(self, *args, **kwargs)
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "mean": round(statistics.fmean(values), 3),
+        "p50": round(values[len(values) // 2], 3),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "max": round(values[-1], 3),
+    }
+
+
+async def open_session(view):
+    conn = CountingConnection()
+    page = ft.Page(conn, f"bench-{id(conn)}", asyncio.get_running_loop())
+    await app.main(page)
+    if view:
+        nav = next(c for c in page.controls[0].controls if isinstance(c, ft.NavigationBar))
+        nav.selected_index = view
+        await nav.on_change(ft.ControlEvent("", "change", str(view), nav, page))
+    return page, conn
+
+
+def phase_totals(name):
+    stat = app.metrics.phases.get(name)
+    return (stat[0], stat[1]) if stat else (0, 0.0)
+
+
+def decode_seconds():
+    phases = app.metrics.phases
+    return sum(phases[name][1] for name in ("inflate", "parse") if name in phases)
+
+
+async def run_scenario(tables, sessions, cycles, churn, view, seed, wire_format="columnar",
+                       encoding="gzip", sync="delta"):
+    floor = dev_server.FloorSimulator(tables, churn, seed)
+    server = dev_server.start_server(floor, compress=encoding != "identity")
+    host, port = server.server_address
+    hub = BenchHub(f"http://{host}:{port}/data", push_url=None,
+                   history=app.HistoryStore(), analytics=app.AnalyticsEngine())
+    feed = hub.venues[0]
+    feed.wire_format = wire_format
+    app.data_hub, app.history_store, app.analytics_engine = hub, hub.history, hub.analytics
+
+    rss_before = rss_kb()
+    pages = [await open_session(view) for _ in range(sessions)]
+    # Warm-up cycle: first full paint is not part of the steady state
+    hub._publish(dict(hub.poll_once(), poll_interval=app.POLL_INTERVAL))
+    rss_per_session = (rss_kb() - rss_before) / sessions
+
+    latency, fetch, controls, messages, sent_bytes, cpu = [], [], [], [], [], []
+    poll_bytes, decode, alert, summary = [], [], [], []
+    for _ in range(cycles):
+        floor.tick()
+        if sync == "full":
+            feed.version = None  # no cursor: the server answers with the whole document
+        sent = [(conn.messages, conn.bytes) for _, conn in pages]
+        allocated = _allocated["controls"]
+        received, decoded = app.metrics.counters["bytes_received"], decode_seconds()
+        cpu_start = time.process_time()
+        started = time.perf_counter()
+        snapshot = await asyncio.to_thread(hub.poll_once)
+        fetched = time.perf_counter()
+        poll_bytes.append(app.metrics.counters["bytes_received"] - received)
+        decode.append((decode_seconds() - decoded) * 1000)
+        alerts_before = phase_totals("alert_to_screen")
+        hub._publish(dict(snapshot, poll_interval=app.POLL_INTERVAL))
+        latency.append((time.perf_counter() - started) * 1000)
+        count, total = phase_totals("alert_to_screen")
+        if count > alerts_before[0]:
+            alert.append((total - alerts_before[1]) / (count - alerts_before[0]) * 1000)
+        fetch.append((fetched - started) * 1000)
+        # Tier 2 runs off the shared timer; fire it here so its cost is measured too
+        # (CPU, controls, messages and bytes below include it)
+        summary_started = time.perf_counter()
+        for callback in list(app.timer_service._subscribers.get(app.SUMMARY_REFRESH_INTERVAL, {}).values()):
+            callback(time.time())
+        summary.append((time.perf_counter() - summary_started) * 1000 / sessions)
+        cpu.append((time.process_time() - cpu_start) * 1000 / sessions)
+        controls.append((_allocated["controls"] - allocated) / sessions)
+        messages.append(sum(conn.messages - m for (_, conn), (m, _) in zip(pages, sent)) / sessions)
+        sent_bytes.append(sum(conn.bytes - b for (_, conn), (_, b) in zip(pages, sent)) / sessions)
+
+    for page, _ in pages:
+        await page.on_disconnect(None)
+    server.shutdown()
+    server.server_close()
+    return {
+        "tables": tables,
+        "sessions": sessions,
+        "cycles": cycles,
+        "churn": churn,
+        "view": view,
+        "format": wire_format,
+        "encoding": encoding,
+        "sync": sync,
+        "latency_ms": summarize(latency),
+        "alert_ms": summarize(alert) if alert else None,
+        "summary_ms": summarize(summary),
+        "fetch_ms": summarize(fetch),
+        "controls_per_cycle": summarize(controls),
+        "messages_per_cycle": summarize(messages),
+        "bytes_per_cycle": summarize(sent_bytes),
+        "cpu_ms_per_cycle": summarize(cpu),
+        "rss_kb_per_session": round(rss_per_session, 1),
+        "bytes_per_poll": summarize(poll_bytes),
+        "decode_ms_per_poll": summarize(decode),
+    }
+
+
+async def run(args):
+    ft.Control.__init__ = _counting_init
+    try:
+        results = []
+        for tables in args.tables:
+            for wire_format in args.formats:
+                for encoding in args.encodings:
+                    result = await run_scenario(tables, args.sessions, args.cycles, args.churn, args.view,
+                                                args.seed, wire_format, encoding, args.sync)
+                    results.append(result)
+                    print(f"{tables:>6} tables {wire_format:>8}/{encoding:<8}: "
+                          f"{result['latency_ms']['mean']:8.2f} ms/cycle, "
+                          f"{(result['alert_ms'] or {}).get('mean', 0):6.2f} ms alert, "
+                          f"{result['summary_ms']['mean']:6.2f} ms summary, "
+                          f"{result['bytes_per_cycle']['mean']:9.0f} B/session/cycle, "
+                          f"{result['controls_per_cycle']['mean']:7.1f} controls/session/cycle, "
+                          f"{result['bytes_per_poll']['mean']:9.0f} B/poll, "
+                          f"{result['decode_ms_per_poll']['mean']:6.2f} ms decode/poll", file=sys.stderr)
+        return results
+    finally:
+        ft.Control.__init__ = _control_init
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless SmartOps dashboard benchmark")
+    parser.add_argument("--tables", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--cycles", type=int, default=30)
+    parser.add_argument("--churn", type=float, default=2, help="table status changes per cycle")
+    parser.add_argument("--view", type=int, default=0, choices=[0, 1, 2], help="0 dashboard, 1 monitor, 2 data logs")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--formats", nargs="+", default=["columnar"], choices=["json", "columnar"])
+    parser.add_argument("--encodings", nargs="+", default=["gzip"], choices=["identity", "gzip"])
+    parser.add_argument("--sync", default="delta", choices=["delta", "full"])
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout (progress goes to stderr)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report = {
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "flet": getattr(ft, "__version__", None) or ft.version.version,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""Local stand-in for the SmartOps restaurant server.
+
+Simulates a floor of tables that randomly call for and receive service, and
+serves it the same way the real backend does, so the app can be run and
+tested without network access:
+
+    GET /data     full JSON snapshot (with ETag / If-None-Match support)
+    GET /data?since=<version>
+                  delta against an earlier snapshot version: the tables that
+                  changed since then as `upserts` (plus `deletes`), or a full
+                  snapshot when that version is no longer in the change log
+    GET /events   Server-Sent Events stream: one `snapshot` event on connect,
+                  then a `table` event per status change and an `analytics`
+                  event after each batch of changes
+
+/data bodies are gzip/deflate compressed when the client's Accept-Encoding
+allows it, and sent in the compact columnar layout (live_status as parallel
+columns with a status dictionary) when its Accept names
+application/vnd.smartops.columnar+json; otherwise they are plain JSON.
+
+Run it and point the app at it:
+
+    python dev_server.py --port 8000 --tables 24
+    SMARTOPS_SERVER_URL=http://127.0.0.1:8000 flet run main.py
+"""
+import argparse
+import collections
+import gzip
+import json
+import random
+import threading
+import time
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUSES = ["Idle", "Customer_Called", "Waiter_Responded"]
+KEEPALIVE_INTERVAL = 15  # seconds between SSE comment lines on a quiet stream
+CHANGE_LOG_LENGTH = 256  # versions a delta can reach back; older clients get a full snapshot
+COLUMNAR_CONTENT_TYPE = "application/vnd.smartops.columnar+json"
+MIN_COMPRESS_SIZE = 256  # smaller bodies are sent as they are
+
+
+def to_columns(entries):
+    """Columnar form of a list of table entries; `status` indexes `statuses`."""
+    statuses = list(STATUSES)
+    codes = []
+    for entry in entries:
+        if entry["status"] not in statuses:
+            statuses.append(entry["status"])
+        codes.append(statuses.index(entry["status"]))
+    return {
+        "statuses": statuses,
+        "table_id": [entry["table_id"] for entry in entries],
+        "status": codes,
+        "minutes_ago": [entry["minutes_ago"] for entry in entries],
+    }
+
+
+def accepted(header, name):
+    """True when an Accept/Accept-Encoding header lists `name` with q > 0."""
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() == name:
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+class FloorSimulator:
+    """Thread-safe in-memory floor. tick() applies random status changes and
+    wakes every stream waiting in wait_for_change()."""
+
+    def __init__(self, tables=12, churn=0.5, seed=None):
+        self.rng = random.Random(seed)
+        self.churn = churn
+        self.version = 0
+        self.started = time.time()
+        self.tables = {
+            t_id: {"table_id": t_id, "status": "Idle", "changed_at": self.started}
+            for t_id in range(1, tables + 1)
+        }
+        self.total_calls = 0
+        self.responses = []
+        self.hourly = [0] * 7
+        self.changes = []
+        # (version, time, changed table ids) per tick, for ?since= deltas
+        self.log = collections.deque(maxlen=CHANGE_LOG_LENGTH)
+        self.cond = threading.Condition()
+
+    def _entry(self, table, now):
+        return {
+            "table_id": table["table_id"],
+            "status": table["status"],
+            "minutes_ago": int((now - table["changed_at"]) // 60),
+        }
+
+    def live_status(self, now=None):
+        now = now or time.time()
+        return [self._entry(t, now) for t in self.tables.values()]
+
+    def analytics(self):
+        open_count = sum(1 for t in self.tables.values() if t["status"] == "Idle")
+        avg_resp = round(sum(self.responses) / len(self.responses) / 60, 1) if self.responses else 0
+        return {
+            "total": self.total_calls,
+            "open": sum(1 for t in self.tables.values() if t["status"] == "Customer_Called"),
+            "avg_resp": avg_resp,
+            "avg_dlv": 0,
+            "hourly": {str(i): v for i, v in enumerate(self.hourly)},
+            "open_count": open_count,
+            "closed_count": len(self.tables) - open_count,
+        }
+
+    def snapshot(self):
+        with self.cond:
+            return {"version": self.version, "analytics": self.analytics(), "live_status": self.live_status()}
+
+    def tick(self):
+        """Changes about `churn` tables per call. Returns the changed entries."""
+        now = time.time()
+        with self.cond:
+            count = int(self.churn) + (1 if self.rng.random() < self.churn % 1 else 0)
+            changed = []
+            for table in self.rng.sample(list(self.tables.values()), min(count, len(self.tables))):
+                status = self.rng.choice([s for s in STATUSES if s != table["status"]])
+                if status == "Customer_Called":
+                    self.total_calls += 1
+                    self.hourly[int(now - self.started) // 3600 % 7] += 1
+                elif table["status"] == "Customer_Called":
+                    self.responses.append(now - table["changed_at"])
+                table["status"] = status
+                table["changed_at"] = now
+                changed.append(self._entry(table, now))
+            if changed:
+                self.version += 1
+                self.changes = changed
+                self.log.append((self.version, now, [entry["table_id"] for entry in changed]))
+                self.cond.notify_all()
+            return changed
+
+    def delta(self, since):
+        """The changes after version `since`, or None when the change log no
+        longer reaches back that far (the client must then resync).
+
+        Besides status changes, a table whose "minutes ago" figure rolled over
+        since then is included, so the client's labels stay current.
+        """
+        now = time.time()
+        with self.cond:
+            if since == 0 and (not self.log or self.log[0][0] == 1):
+                since_ts = self.started
+            else:
+                since_ts = next((ts for version, ts, _ in self.log if version == since), None)
+                if since_ts is None:
+                    return None
+            changed = {t_id for version, _, ids in self.log if version > since for t_id in ids}
+            for t_id, table in self.tables.items():
+                if int((now - table["changed_at"]) // 60) != int((since_ts - table["changed_at"]) // 60):
+                    changed.add(t_id)
+            return {
+                "delta": True,
+                "since": since,
+                "version": self.version,
+                "analytics": self.analytics(),
+                "upserts": [self._entry(self.tables[t_id], now) for t_id in sorted(changed) if t_id in self.tables],
+                "deletes": [t_id for t_id in sorted(changed) if t_id not in self.tables],
+            }
+
+    def wait_for_change(self, version, timeout):
+        """Blocks until the floor moves past `version`; returns (version, changes)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.version != version, timeout)
+            return self.version, list(self.changes) if self.version == version + 1 else None
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus the
+    # client's delayed ACK adds ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+    floor = None
+    compress = True  # honour Accept-Encoding on /data
+    columnar = True  # honour Accept: application/vnd.smartops.columnar+json
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def send_body(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200 if self.path.split("?")[0] == "/data" else 404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/data":
+            self.serve_data()
+        elif path == "/events":
+            self.serve_events()
+        else:
+            self.send_body(404, b'{"error": "not found"}')
+
+    def serve_data(self):
+        etag = f'"{self.floor.version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        payload = None
+        if "since" in query:
+            try:
+                payload = self.floor.delta(int(query["since"][0]))
+            except ValueError:
+                pass
+        if payload is None:
+            payload = self.floor.snapshot()
+        # The ETag is read before the body, so at worst a client refetches once
+        self.send_payload(payload, {"ETag": etag})
+
+    def send_payload(self, payload, headers):
+        content_type = "application/json"
+        if self.columnar and accepted(self.headers.get("Accept"), COLUMNAR_CONTENT_TYPE):
+            content_type = COLUMNAR_CONTENT_TYPE
+            payload = dict(payload)
+            for key in ("live_status", "upserts"):
+                if key in payload:
+                    payload[key] = to_columns(payload[key])
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        headers = dict(headers, Vary="Accept, Accept-Encoding")
+        accept_encoding = self.headers.get("Accept-Encoding")
+        if self.compress and len(body) >= MIN_COMPRESS_SIZE:
+            if accepted(accept_encoding, "gzip"):
+                body, headers["Content-Encoding"] = gzip.compress(body, 6), "gzip"
+            elif accepted(accept_encoding, "deflate"):
+                body, headers["Content-Encoding"] = zlib.compress(body, 6), "deflate"
+        self.send_body(200, body, content_type, headers)
+
+    def send_event(self, event, payload):
+        data = json.dumps(payload, separators=(",", ":"))
+        self.wfile.write(f"event: {event}\ndata: {data}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def serve_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            snapshot = self.floor.snapshot()
+            version = snapshot["version"]
+            self.send_event("snapshot", snapshot)
+            while True:
+                new_version, changes = self.floor.wait_for_change(version, KEEPALIVE_INTERVAL)
+                if new_version == version:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                if changes is None:
+                    # Missed more than one batch; resynchronise the client
+                    self.send_event("snapshot", self.floor.snapshot())
+                else:
+                    for entry in changes:
+                        self.send_event("table", entry)
+                    self.send_event("analytics", self.floor.snapshot()["analytics"])
+                version = new_version
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def run_simulation(floor, interval):
+    while True:
+        time.sleep(interval)
+        floor.tick()
+
+
+def start_server(floor, host="127.0.0.1", port=0, compress=True, columnar=True):
+    """Serves `floor` on a background thread; port 0 picks a free port.
+    Returns the server (see server.server_address)."""
+    handler = type("FloorHandler", (Handler,), {"floor": floor, "compress": compress, "columnar": columnar})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--tables", type=int, default=12, help="number of tables on the floor")
+    parser.add_argument("--churn", type=float, default=0.5, help="status changes per tick")
+    parser.add_argument("--tick", type=float, default=1.0, help="seconds between ticks")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-compress", action="store_true", help="ignore Accept-Encoding on /data")
+    parser.add_argument("--json-only", action="store_true", help="never send the columnar encoding")
+    args = parser.parse_args()
+
+    floor = FloorSimulator(args.tables, args.churn, args.seed)
+    threading.Thread(target=run_simulation, args=(floor, args.tick), daemon=True).start()
+    start_server(floor, args.host, args.port, compress=not args.no_compress, columnar=not args.json_only)
+    print(f"SmartOps dev server on http://{args.host}:{args.port} ({args.tables} tables)")
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
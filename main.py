@@ -1,15 +1,76 @@
 import flet as ft
-import urllib.request
+import array
+import asyncio
+import bisect
+import math
+import os
+import sqlite3
+import ssl
+import urllib.parse
+import http.client
+import http.server
+import collections
+import concurrent.futures
+import hashlib
 import json
+import random
+import sys
 import threading
 import time
 import datetime
+import functools
+import gzip
+import zlib
 
 # ==========================================
 # 1. CONFIGURATION & THEME
 # ==========================================
-SERVER_URL = "https://restaurent-server-vzsj.onrender.com"
+SERVER_URL = os.environ.get("SMARTOPS_SERVER_URL", "https://restaurent-server-vzsj.onrender.com")
 DATA_ENDPOINT = f"{SERVER_URL}/data"
+PUSH_ENDPOINT = f"{SERVER_URL}/events"  # SSE stream; /data polling is used while it is unavailable
+# Several restaurants on one screen: SMARTOPS_VENUES="Downtown=https://a.example,Harbor=https://b.example".
+# Unset, the single SERVER_URL venue is watched and table ids stay unprefixed.
+VENUES = [
+    tuple(part.strip() for part in venue.split("=", 1))
+    for venue in os.environ.get("SMARTOPS_VENUES", "").split(",") if "=" in venue
+] or [("", SERVER_URL)]
+VENUE_CONCURRENCY = 8  # venues fetched in parallel
+VENUE_TIMEOUT = 5      # seconds a cycle waits for venues; slower ones keep their last data
+PUSH_RETRY_INTERVAL = 60    # seconds of polling before a failed push stream is tried again
+PUSH_IDLE_TIMEOUT = 45      # seconds without any bytes (events or keepalives) before the stream is dropped
+POLL_INTERVAL = 3  # baseline seconds between polls of DATA_ENDPOINT
+POLL_URGENT_INTERVAL = 1    # while any table is Customer_Called
+POLL_QUIET_INTERVAL = 10    # after POLL_QUIET_AFTER unchanged snapshots in a row
+POLL_QUIET_AFTER = 20
+POLL_BACKOFF_MAX = 60       # ceiling for the exponential backoff while offline
+POLL_JITTER = 0.2           # +/- fraction applied to every delay
+HTTP_CONNECT_TIMEOUT = 3  # seconds to open a socket to the server
+HTTP_READ_TIMEOUT = 4     # seconds to wait for a response on an open socket
+ACCEPT_ENCODING = "gzip, deflate"  # negotiated compression of HTTP bodies
+# Compact /data encoding: live_status as parallel columns plus a status dictionary.
+# Asked for via Accept; servers that do not know it answer plain JSON.
+COLUMNAR_CONTENT_TYPE = "application/vnd.smartops.columnar+json"
+WIRE_FORMAT = os.environ.get("SMARTOPS_WIRE_FORMAT", "columnar")  # "columnar" or "json"
+HISTORY_CAPACITY = 4096   # rows per in-memory history ring (transitions, KPI samples)
+HISTORY_DB_PATH = os.environ.get("SMARTOPS_HISTORY_DB")  # optional SQLite file for a rolling on-disk history
+HISTORY_RETENTION_HOURS = 24
+HISTORY_PERSIST_INTERVAL = 10  # seconds between batched writes to HISTORY_DB_PATH
+SHIFT_TREND_HOURS = 8  # hourly KPI trend shown in Data Logs
+SNAPSHOT_CACHE_PATH = os.environ.get(                  # last good /data payload, painted at startup ("" disables)
+    "SMARTOPS_SNAPSHOT_CACHE", os.path.join(os.path.expanduser("~"), ".smartops_snapshot.json")) or None
+SNAPSHOT_MAX_AGE_HOURS = 12  # an older cached floor is not worth showing
+SNAPSHOT_SAVE_INTERVAL = 30  # seconds between rewrites of the cache file
+# Seconds without input before a session is paused and released. Off by default:
+# a Monitor screen nobody touches is being watched, not abandoned
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SMARTOPS_SESSION_IDLE_TIMEOUT", 0))
+SESSION_REAP_INTERVAL = 60  # seconds between idle-session sweeps
+METRICS_PORT = int(os.environ.get("SMARTOPS_METRICS_PORT", "0")) or None  # local /metrics endpoint; off by default
+DIAGNOSTICS_PANEL = os.environ.get("SMARTOPS_DIAGNOSTICS") == "1"      # adds a Diagnostics tab to the app
+SUMMARY_REFRESH_INTERVAL = 5  # seconds; KPIs, charts and the activity feed refresh on this coalesced cadence
+ALERT_BANNER = os.environ.get("SMARTOPS_ALERT_BANNER", "1") != "0"  # banner for new Customer_Called tables
+ALERT_BANNER_SECONDS = 10     # how long a banner stays up unless dismissed
+LOG_ROW_HEIGHT = 48   # fixed Master Log row height, so scroll offset maps to a row index
+LOG_OVERSCAN = 10     # Master Log rows kept built above and below the viewport
 
 # Theme Colors - Matches your "SmartOps" design
 COLOR_BG = "#F5F7FA"           
@@ -22,12 +83,6 @@ COLOR_DANGER = "#EF4444"
 COLOR_TEXT_MAIN = "#1E293B"    
 COLOR_TEXT_MUTED = "#94A3B8"   
 
-# Global State
-app_state = {
-    "running": True,
-    "server_online": False,
-}
-
 # ==========================================
 # 2. UTILS & NETWORK LAYER
 # ==========================================
@@ -45,35 +100,1491 @@ def get_hex_opacity(hex_color, opacity):
     except Exception:
         return "#000000"
 
-def http_get_json(url, timeout=4):
+class _PhaseTimer:
+    __slots__ = ("metrics", "phase", "started")
+
+    def __init__(self, metrics, phase):
+        self.metrics = metrics
+        self.phase = phase
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.phase, time.perf_counter() - self.started)
+        return False
+
+class Metrics:
+    """Process-wide timers, error counts, counters and gauges for the poll/render path;
+    cheap enough to stay on. Exported as JSON or Prometheus text."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.phases = {}  # phase -> [count, total_s, max_s, last_s]
+        self.errors = collections.Counter()
+        self.counters = collections.Counter()
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def timer(self, phase):
+        return _PhaseTimer(self, phase)
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            stat = self.phases.get(phase)
+            if stat is None:
+                stat = self.phases[phase] = [0, 0.0, 0.0, 0.0]
+            stat[0] += 1
+            stat[1] += seconds
+            stat[3] = seconds
+            if seconds > stat[2]:
+                stat[2] = seconds
+
+    def error(self, where, exc):
+        with self._lock:
+            self.errors[(where, type(exc).__name__)] += 1
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def set(self, name, value):
+        self.gauges[name] = value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "uptime_s": round(time.time() - self.started, 1),
+                "gauges": dict(self.gauges),
+                "phases": {
+                    phase: {
+                        "count": count,
+                        "avg_ms": round(total / count * 1000, 3),
+                        "max_ms": round(peak * 1000, 3),
+                        "last_ms": round(last * 1000, 3),
+                    }
+                    for phase, (count, total, peak, last) in self.phases.items()
+                },
+                "errors": {f"{where}/{kind}": n for (where, kind), n in self.errors.items()},
+                "counters": dict(self.counters),
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        with self._lock:
+            lines = [
+                "# TYPE smartops_phase_seconds_total counter",
+                *(f'smartops_phase_seconds_total{{phase="{p}"}} {s[1]:.6f}' for p, s in self.phases.items()),
+                "# TYPE smartops_phase_runs_total counter",
+                *(f'smartops_phase_runs_total{{phase="{p}"}} {s[0]}' for p, s in self.phases.items()),
+                "# TYPE smartops_phase_seconds_max gauge",
+                *(f'smartops_phase_seconds_max{{phase="{p}"}} {s[2]:.6f}' for p, s in self.phases.items()),
+                "# TYPE smartops_errors_total counter",
+                *(f'smartops_errors_total{{where="{w}",type="{k}"}} {n}' for (w, k), n in self.errors.items()),
+            ]
+            for name, value in self.counters.items():
+                lines += [f"# TYPE smartops_{name}_total counter", f"smartops_{name}_total {value}"]
+            for name, value in self.gauges.items():
+                if isinstance(value, (bool, int, float)):
+                    lines += [f"# TYPE smartops_{name} gauge", f"smartops_{name} {float(value)}"]
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = metrics.to_prometheus(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = metrics.to_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+_metrics_server = None
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serves /metrics (Prometheus text) and /metrics.json on localhost; once per process."""
+    global _metrics_server
+    if not port or _metrics_server is not None:
+        return
     try:
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            if resp.status == 200:
-                data = resp.read()
-                return json.loads(data.decode("utf-8"))
-    except Exception:
-        return None
+        _metrics_server = http.server.ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    except OSError as e:
+        metrics.error("metrics_server", e)
+        return
+    threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+
+def decode_content(body, content_encoding):
+    """Undoes a gzip/deflate Content-Encoding; raises zlib.error on a bad body."""
+    encoding = (content_encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        # RFC 9110 deflate is zlib-wrapped, but some servers send it raw
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+def rows_from_columns(columns):
+    """Expands a columnar table block into row dicts. Every key except
+    `statuses` is a column; `status` holds indexes into `statuses`."""
+    statuses = columns.get("statuses")
+    names = [name for name in columns if name != "statuses"]
+    values = [
+        [statuses[code] for code in columns[name]] if name == "status" and statuses else columns[name]
+        for name in names
+    ]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+def decode_payload(body, content_type=None):
+    """Parses a /data body by content type; columnar blocks come back as the
+    plain JSON shape, so callers never see the wire format."""
+    payload = json.loads(body.decode("utf-8"))
+    if (content_type or "").split(";")[0].strip() == COLUMNAR_CONTENT_TYPE and isinstance(payload, dict):
+        for key in ("live_status", "upserts"):
+            if isinstance(payload.get(key), dict):
+                payload[key] = rows_from_columns(payload[key])
+    return payload
+
+# What a reused keep-alive socket fails with after the server closed it
+_STALE_SOCKET_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+class HttpClient:
+    """Keep-alive HTTP(S) client for one origin; asks for compressed bodies and
+    returns them decoded (`last_wire_bytes` is the size on the wire)."""
+
+    def __init__(self, base_url, connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT):
+        parts = urllib.parse.urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.last_latency = None
+        self.last_wire_bytes = 0
+        self.latencies = collections.deque(maxlen=100)
+        self.connects = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn_cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = conn_cls(self.host, self.port, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        self.connects += 1
+        return conn
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def request(self, method, path, headers=None):
+        """Returns (status, headers, body). Raises OSError/HTTPException when
+        the server is unreachable, zlib.error when the body does not inflate."""
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+        with self._lock:
+            while True:
+                reused = self._conn is not None
+                if not reused:
+                    self._conn = self._open()
+                started = time.perf_counter()
+                try:
+                    self._conn.request(method, path, headers=headers)
+                    resp = self._conn.getresponse()
+                    body = resp.read()
+                except (http.client.HTTPException, OSError) as e:
+                    self.close()
+                    # A kept-alive socket the server already dropped is retried once
+                    # on a fresh one; a timeout means a slow server and is not resent
+                    if reused and isinstance(e, _STALE_SOCKET_ERRORS):
+                        continue
+                    raise
+                self.last_latency = time.perf_counter() - started
+                self.latencies.append(self.last_latency)
+                if resp.will_close:
+                    self.close()
+                self.last_wire_bytes = len(body)
+                if resp.headers.get("Content-Encoding"):
+                    with metrics.timer("inflate"):
+                        body = decode_content(body, resp.headers.get("Content-Encoding"))
+                return resp.status, resp.headers, body
+
+_http_clients = {}
+_http_clients_lock = threading.Lock()
+
+def get_http_client(url):
+    # One pooled client per origin, shared by everything in the process
+    parts = urllib.parse.urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    with _http_clients_lock:
+        client = _http_clients.get(key)
+        if client is None:
+            client = HttpClient(f"{parts.scheme}://{parts.netloc}")
+            _http_clients[key] = client
+        return client
 
-def check_server_health():
+def request_path(url):
+    parts = urllib.parse.urlsplit(url)
+    return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+class PushUnavailable(Exception):
+    """The server does not offer an event stream at this URL."""
+
+async def _read_stream_lines(reader, chunked, idle_timeout):
+    # Yields decoded lines of a streamed body, undoing chunked transfer encoding
+    if not chunked:
+        while True:
+            line = await asyncio.wait_for(reader.readline(), idle_timeout)
+            if not line:
+                return
+            yield line.decode("utf-8").rstrip("\r\n")
+    buffer = b""
+    while True:
+        size_line = await asyncio.wait_for(reader.readline(), idle_timeout)
+        size = int(size_line.split(b";")[0].strip() or b"0", 16)
+        if size == 0:
+            return
+        buffer += (await asyncio.wait_for(reader.readexactly(size + 2), idle_timeout))[:-2]
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+
+async def iter_sse_events(url, connect_timeout=HTTP_CONNECT_TIMEOUT, idle_timeout=PUSH_IDLE_TIMEOUT):
+    """Async generator of (event, data) pairs from a Server-Sent Events stream.
+    Raises PushUnavailable, or OSError/asyncio.TimeoutError once the stream drops or goes silent."""
+    parts = urllib.parse.urlsplit(url)
+    https = parts.scheme == "https"
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(
+            parts.hostname, parts.port or (443 if https else 80),
+            ssl=ssl.create_default_context() if https else None,
+            limit=2 ** 22,
+        ),
+        connect_timeout,
+    )
     try:
-        req = urllib.request.Request(DATA_ENDPOINT, method="HEAD")
-        with urllib.request.urlopen(req, timeout=3) as resp:
-            return resp.status == 200
-    except Exception:
-        return False
+        writer.write(
+            f"GET {request_path(url)} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+            "Accept: text/event-stream\r\nCache-Control: no-cache\r\n\r\n".encode("ascii")
+        )
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), idle_timeout)
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), idle_timeout)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        status = status_line.split()[1:2]
+        if status != [b"200"] or not headers.get("content-type", "").startswith("text/event-stream"):
+            raise PushUnavailable(status_line.decode("latin-1").strip())
+
+        chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        event, data = "message", []
+        async for line in _read_stream_lines(reader, chunked, idle_timeout):
+            if not line:
+                if data:
+                    yield event, "\n".join(data)
+                event, data = "message", []
+            elif line.startswith(":"):
+                continue  # keepalive comment
+            else:
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "event":
+                    event = value
+                elif field == "data":
+                    data.append(value)
+    finally:
+        writer.close()
+
+# ==========================================
+# 3. LOCAL HISTORY & ANALYTICS
+# ==========================================
+# Status codes are indexes into these lists; statuses the server invents
+# later are appended on first sight and render with the fallback style
+STATUS_NAMES = ["Idle", "Customer_Called", "Waiter_Responded"]
+STATUS_LABELS = [name.replace("_", " ") for name in STATUS_NAMES]
+_STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+def status_code(name):
+    code = _STATUS_CODES.get(name)
+    if code is None:
+        code = _STATUS_CODES[name] = len(STATUS_NAMES)
+        STATUS_NAMES.append(name)
+        STATUS_LABELS.append(name.replace("_", " "))
+    return code
+
+class TableState:
+    """One table as the views see it. Never modified: a change makes a new one."""
+
+    __slots__ = ("table_id", "code", "minutes_ago", "since", "label", "id_label")
+
+    def __init__(self, table_id, code, minutes_ago, since, id_label=None):
+        self.table_id = table_id
+        self.code = code
+        self.minutes_ago = minutes_ago
+        self.since = since  # when the current status began, as far as the server's minutes tell
+        self.label = STATUS_LABELS[code]
+        self.id_label = id_label or f"T-{table_id}"
+
+    @property
+    def status(self):
+        return STATUS_NAMES[self.code]
+
+    def minutes_at(self, now):
+        # Between snapshots the "min ago" figure keeps counting locally
+        return max(0, int((now - self.since) // 60))
+
+class TableStore:
+    """The decoded floor, shared by the hub and every view; update() reuses the
+    state of every unchanged table so views can patch just the changed ones."""
+
+    def __init__(self):
+        self.rows = []
+        self.by_id = {}
+        self.by_status = collections.defaultdict(set)
+        self.version = 0
+        self.layout_version = 0
+        self.changed = []
+
+    def count(self, status):
+        return len(self.by_status.get(_STATUS_CODES.get(status), ()))
+
+    def forget(self):
+        """Drops the known states, so the next update() reports every table as
+        new; the views still patch against their own last version."""
+        self.by_id = {}
+        self.by_status = collections.defaultdict(set)
+
+    def update(self, live_status, ts=None):
+        """Decodes a snapshot; returns the transitions (table_id, old, new, item),
+        with `old` None for a new table and `new` None for a removed one."""
+        ts = ts or time.time()
+        previous, old_rows = self.by_id, self.rows
+        by_id, rows, changed, transitions = {}, [], [], []
+        moved = False
+        for item in live_status:
+            if not isinstance(item, dict):
+                continue
+            t_id = item.get('table_id')
+            if t_id in by_id:
+                continue
+            code = status_code(item.get('status') or "Idle")
+            minutes_ago = item.get('minutes_ago') or 0
+            state = previous.get(t_id)
+            if state is None or state.code != code or state.minutes_ago != minutes_ago:
+                if state is None or state.code != code:
+                    transitions.append((t_id, state.status if state else None, STATUS_NAMES[code], item))
+                    if state is not None:
+                        self.by_status[state.code].discard(t_id)
+                    self.by_status[code].add(t_id)
+                minutes = _as_float(minutes_ago)
+                since = ts - (0 if math.isnan(minutes) else minutes * 60)
+                state = TableState(t_id, code, minutes_ago, since, state.id_label if state else None)
+                changed.append(state)
+            if not moved and (len(rows) >= len(old_rows) or old_rows[len(rows)].table_id != t_id):
+                moved = True
+            by_id[t_id] = state
+            rows.append(state)
+        if len(rows) != len(old_rows):
+            moved = True
+        for t_id, state in previous.items():
+            if t_id not in by_id:
+                transitions.append((t_id, state.status, None, None))
+                self.by_status[state.code].discard(t_id)
+        self.rows, self.by_id, self.changed = rows, by_id, changed
+        self.version += 1
+        if moved:
+            self.layout_version += 1
+        return transitions
+
+class RingBuffer:
+    """Fixed-capacity columnar ring buffer on `array.array`; the first column is a
+    non-decreasing timestamp."""
+
+    def __init__(self, capacity, **columns):
+        self.capacity = capacity
+        self.names = tuple(columns)
+        self.columns = [array.array(code, [0]) * capacity for code in columns.values()]
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, *values):
+        i = (self.start + self.size) % self.capacity
+        for column, value in zip(self.columns, values):
+            column[i] = value
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def _at(self, k):
+        # k-th oldest row
+        i = (self.start + k) % self.capacity
+        return tuple(column[i] for column in self.columns)
+
+    def oldest_ts(self):
+        return self.columns[0][self.start] if self.size else None
+
+    def rows(self, since=None):
+        """Rows oldest first, optionally only those with timestamp >= since."""
+        first = 0
+        if since is not None:
+            ts = self.columns[0]
+            first = bisect.bisect_left(range(self.size), since, key=lambda k: ts[(self.start + k) % self.capacity])
+        return [self._at(k) for k in range(first, self.size)]
+
+    def last(self, count):
+        """The newest `count` rows, newest first."""
+        return [self._at(k) for k in range(self.size - 1, max(-1, self.size - 1 - count), -1)]
+
+KPI_FIELDS = ("total", "open", "avg_resp", "avg_dlv", "called")
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _bucket_means(rows, since, bucket_seconds, column):
+    sums, counts = {}, {}
+    for row in rows:
+        value = row[column]
+        if math.isnan(value):
+            continue
+        b = int((row[0] - since) // bucket_seconds)
+        sums[b] = sums.get(b, 0.0) + value
+        counts[b] = counts.get(b, 0) + 1
+    return [(since + b * bucket_seconds, sums[b] / counts[b]) for b in sorted(sums)]
+
+class HistoryStore:
+    """Recent status transitions and KPI samples in ring buffers, optionally
+    mirrored to a rolling SQLite file for older queries."""
+
+    def __init__(self, capacity=HISTORY_CAPACITY, db_path=None, retention_hours=HISTORY_RETENTION_HOURS):
+        self.transitions = RingBuffer(capacity, ts="d", table="l", old="l", new="l")
+        self.kpis = RingBuffer(capacity, ts="d", total="d", open="d", avg_resp="d", avg_dlv="d", called="d")
+        self.table_keys, self._table_index = [], {}
+        self.status_names, self._status_index = [], {}
+        self.transition_count = 0
+        self.retention = retention_hours * 3600
+        self._pending_transitions = []
+        self._pending_kpis = []
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.executescript(
+                    "CREATE TABLE IF NOT EXISTS transitions (ts REAL, table_id TEXT, old TEXT, new TEXT);"
+                    "CREATE INDEX IF NOT EXISTS transitions_ts ON transitions (ts);"
+                    "CREATE TABLE IF NOT EXISTS kpis (ts REAL, total REAL, open REAL, avg_resp REAL, avg_dlv REAL, called REAL);"
+                    "CREATE INDEX IF NOT EXISTS kpis_ts ON kpis (ts);"
+                )
+            except sqlite3.Error:
+                self._db = None
+
+    def _intern(self, names, index, value):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(names)
+            names.append(value)
+        return code
+
+    def record(self, data, ts, tables, transitions):
+        """Appends one snapshot's status transitions and one KPI sample."""
+        for t_id, old, status, _ in transitions:
+            if old is None or status is None:
+                continue
+            self.transitions.append(
+                ts,
+                self._intern(self.table_keys, self._table_index, t_id),
+                self._intern(self.status_names, self._status_index, old),
+                self._intern(self.status_names, self._status_index, status),
+            )
+            self.transition_count += 1
+            if self._db is not None:
+                self._pending_transitions.append((ts, str(t_id), old, status))
+
+        analytics = data.get('analytics') or {}
+        sample = (
+            ts,
+            _as_float(analytics.get('total')),
+            _as_float(analytics.get('open')),
+            _as_float(analytics.get('avg_resp')),
+            _as_float(analytics.get('avg_dlv')),
+            float(tables.count("Customer_Called")),
+        )
+        self.kpis.append(*sample)
+        if self._db is not None:
+            self._pending_kpis.append(sample)
+
+    def has_pending(self):
+        return bool(self._pending_transitions or self._pending_kpis)
+
+    def persist(self):
+        """Writes buffered rows to SQLite and trims rows past the retention
+        window. Blocking; the hub runs it on a worker thread."""
+        if self._db is None:
+            return
+        transitions, self._pending_transitions = self._pending_transitions, []
+        kpis, self._pending_kpis = self._pending_kpis, []
+        with self._db_lock:
+            try:
+                self._db.executemany("INSERT INTO transitions VALUES (?, ?, ?, ?)", transitions)
+                self._db.executemany("INSERT INTO kpis VALUES (?, ?, ?, ?, ?, ?)", kpis)
+                cutoff = time.time() - self.retention
+                self._db.execute("DELETE FROM transitions WHERE ts < ?", (cutoff,))
+                self._db.execute("DELETE FROM kpis WHERE ts < ?", (cutoff,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                metrics.error("history", e)
+
+    def _from_disk(self, ring, since):
+        # Older than anything still in memory, and a database to ask
+        oldest = ring.oldest_ts()
+        return self._db is not None and (oldest is None or since < oldest)
+
+    def kpi_series(self, field, since, bucket_seconds):
+        """Mean of a KPI per time bucket since `since`: [(bucket_start, value)]."""
+        column = KPI_FIELDS.index(field) + 1
+        if self._from_disk(self.kpis, since):
+            with self._db_lock:
+                rows = self._db.execute(
+                    f"SELECT CAST((ts - ?) / ? AS INTEGER) AS b, AVG({field}) FROM kpis "
+                    "WHERE ts >= ? GROUP BY b ORDER BY b",
+                    (since, bucket_seconds, since),
+                ).fetchall()
+            return [(since + b * bucket_seconds, value) for b, value in rows]
+        return _bucket_means(self.kpis.rows(since), since, bucket_seconds, column)
+
+    def transition_counts(self, status, since, bucket_seconds, buckets):
+        """Number of transitions into `status` per bucket, oldest bucket first."""
+        counts = [0] * buckets
+        if self._from_disk(self.transitions, since):
+            with self._db_lock:
+                rows = self._db.execute(
+                    "SELECT CAST((ts - ?) / ? AS INTEGER) AS b, COUNT(*) FROM transitions "
+                    "WHERE ts >= ? AND new = ? GROUP BY b",
+                    (since, bucket_seconds, since, status),
+                ).fetchall()
+            for b, count in rows:
+                if 0 <= b < buckets:
+                    counts[b] = count
+            return counts
+        code = self._status_index.get(status)
+        for ts, _, _, new in self.transitions.rows(since):
+            b = int((ts - since) // bucket_seconds)
+            if new == code and 0 <= b < buckets:
+                counts[b] += 1
+        return counts
+
+    def hourly_calls(self, hours=7):
+        """Customer_Called transitions per hour for the last `hours` hours, in
+        the same {"0": n, ...} shape as the server's analytics['hourly']."""
+        counts = self.transition_counts("Customer_Called", time.time() - hours * 3600, 3600, hours)
+        return {str(i): count for i, count in enumerate(counts)}
+
+    def recent_transitions(self, limit):
+        """Newest transitions first: [(ts, table_id, old_status, new_status)]."""
+        return [
+            (ts, self.table_keys[table], self.status_names[old], self.status_names[new])
+            for ts, table, old, new in self.transitions.last(limit)
+        ]
+
+history_store = HistoryStore(db_path=HISTORY_DB_PATH)
+
+class SnapshotCache:
+    """The last good /data payload on disk, painted at startup before the server
+    answers. Ignored when its schema, venues or age do not match."""
+
+    SCHEMA = 2
+
+    def __init__(self, path, venues=(), max_age_hours=SNAPSHOT_MAX_AGE_HOURS):
+        self.path = path
+        # (name, url) pairs; a file written against another server is not this floor
+        self.venues = [list(venue) for venue in venues]
+        self.max_age = max_age_hours * 3600
+
+    def load(self, now=None):
+        """Returns (data, saved_at), or None when there is nothing usable."""
+        now = now or time.time()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if (cached.get("schema") != self.SCHEMA or cached.get("venues") != self.venues
+                    or not isinstance(cached.get("data"), dict)):
+                return None
+            saved_at = float(cached["saved_at"])
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return None
+        if now - saved_at > self.max_age:
+            return None
+        return cached["data"], saved_at
+
+    def save(self, data, saved_at):
+        # Write-then-rename so a crash mid-write never leaves a torn file
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"schema": self.SCHEMA, "venues": self.venues, "saved_at": saved_at, "data": data},
+                          f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            metrics.error("snapshot_cache", e)
+
+class QuantileSketch:
+    """Streaming quantiles within `relative_accuracy` (log-spaced buckets, DDSketch style)."""
+
+    def __init__(self, relative_accuracy=0.02):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return None
+
+class AnalyticsEngine:
+    """KPIs kept up to date from status transitions: response and delivery times,
+    open calls and calls per hour."""
+
+    def __init__(self, hours_kept=24):
+        self.calls = 0
+        self.open = 0
+        self.resp_count = 0
+        self.resp_sum = 0.0
+        self.dlv_count = 0
+        self.dlv_sum = 0.0
+        self.resp_sketch = QuantileSketch()
+        self.calls_by_hour = collections.OrderedDict()
+        self.hours_kept = hours_kept
+        self._called_at = {}
+        self._responded_at = {}
+        self._server_total = None
+        self._calls_at_server_total = 0
+
+    def apply(self, transitions, ts):
+        for t_id, old, new, item in transitions:
+            since = ts
+            if old is None:
+                minutes = _as_float((item or {}).get('minutes_ago') or 0)
+                since -= 0 if math.isnan(minutes) else minutes * 60
+            if old == "Customer_Called":
+                self.open -= 1
+                started = self._called_at.pop(t_id, None)
+                if new == "Waiter_Responded" and started is not None:
+                    self.resp_count += 1
+                    self.resp_sum += ts - started
+                    self.resp_sketch.add(ts - started)
+            elif old == "Waiter_Responded":
+                responded = self._responded_at.pop(t_id, None)
+                if new == "Idle" and responded is not None:
+                    self.dlv_count += 1
+                    self.dlv_sum += ts - responded
+            if new == "Customer_Called":
+                self.open += 1
+                self._called_at[t_id] = since
+                if old is not None:
+                    self.calls += 1
+                    self._count_call(ts)
+            elif new == "Waiter_Responded":
+                self._responded_at[t_id] = since
+
+    def _count_call(self, ts):
+        hour = int(ts // 3600) * 3600
+        self.calls_by_hour[hour] = self.calls_by_hour.get(hour, 0) + 1
+        while len(self.calls_by_hour) > self.hours_kept:
+            self.calls_by_hour.popitem(last=False)
+
+    def calls_this_hour(self):
+        return self.calls_by_hour.get(int(time.time() // 3600) * 3600, 0)
+
+    def kpis(self, server):
+        """The server's analytics block overlaid with local figures (open calls, total, averages)."""
+        if not isinstance(server, dict):
+            server = {}
+        merged = dict(server)
+        merged['open'] = self.open
+        total = _as_float(server.get('total'))
+        if math.isnan(total):
+            merged['total'] = self.calls
+        else:
+            if total != self._server_total:
+                self._server_total, self._calls_at_server_total = total, self.calls
+            merged['total'] = int(total) + self.calls - self._calls_at_server_total
+        if server.get('avg_resp') is None and self.resp_count:
+            merged['avg_resp'] = round(self.resp_sum / self.resp_count / 60, 1)
+        if server.get('avg_dlv') is None and self.dlv_count:
+            merged['avg_dlv'] = round(self.dlv_sum / self.dlv_count / 60, 1)
+        p50, p95 = self.resp_sketch.quantile(0.5), self.resp_sketch.quantile(0.95)
+        merged['p50_resp'] = round(p50 / 60, 1) if p50 is not None else None
+        merged['p95_resp'] = round(p95 / 60, 1) if p95 is not None else None
+        return merged
+
+analytics_engine = AnalyticsEngine()
+
+# ==========================================
+# 4. SHARED DATA HUB
+# ==========================================
+class AdaptiveScheduler:
+    """Seconds to sleep after each poll: backoff offline, `urgent` while a table calls,
+    `quiet` after unchanged polls, else `base`, each with +/- `jitter`."""
+
+    def __init__(self, base=POLL_INTERVAL, urgent=POLL_URGENT_INTERVAL, quiet=POLL_QUIET_INTERVAL,
+                 quiet_after=POLL_QUIET_AFTER, backoff_max=POLL_BACKOFF_MAX, jitter=POLL_JITTER):
+        self.base = base
+        self.urgent = urgent
+        self.quiet = quiet
+        self.quiet_after = quiet_after
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.failures = 0
+        self.unchanged = 0
+        self.current_interval = base
+        self.mode = "normal"
+
+    def next_delay(self, snapshot, urgent):
+        if not snapshot["online"]:
+            self.failures += 1
+            self.unchanged = 0
+            self.mode = "backoff"
+            interval = min(self.backoff_max, self.base * 2 ** (self.failures - 1))
+        else:
+            self.failures = 0
+            self.unchanged = 0 if snapshot["changed"] else self.unchanged + 1
+            if urgent:
+                self.mode, interval = "urgent", self.urgent
+            elif self.unchanged >= self.quiet_after:
+                self.mode, interval = "quiet", self.quiet
+            else:
+                self.mode, interval = "normal", self.base
+        self.current_interval = interval
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+def merge_analytics(blocks):
+    """Combines the analytics blocks of several venues: counts and hourly
+    calls are summed, average times are averaged over the venues reporting them."""
+    merged, hourly = {}, {}
+    for key in ('total', 'open', 'open_count', 'closed_count'):
+        values = [_as_float(block.get(key)) for block in blocks]
+        merged[key] = int(sum(v for v in values if not math.isnan(v)))
+    for key in ('avg_resp', 'avg_dlv'):
+        values = [v for v in (_as_float(block.get(key)) for block in blocks) if not math.isnan(v)]
+        if values:
+            merged[key] = round(sum(values) / len(values), 1)
+    for block in blocks:
+        for hour, calls in (block.get('hourly') or {}).items():
+            calls = _as_float(calls)
+            if not math.isnan(calls):
+                hourly[hour] = hourly.get(hour, 0) + calls
+    if hourly:
+        merged['hourly'] = hourly
+    return merged
+
+class VenueFeed:
+    """Conditional-GET and delta-sync (`?since=<version>`) state and last data of one
+    venue's /data; a named venue's table ids get its name as a prefix."""
+
+    def __init__(self, name, endpoint, wire_format=WIRE_FORMAT):
+        self.name = name
+        self.endpoint = endpoint
+        self.wire_format = wire_format
+        self.data = None
+        self.online = False
+        self.latency = None
+        # Conditional GET state: server validators, else a digest of the raw body
+        self._etag = None
+        self._last_modified = None
+        self._digest = None
+        # Server snapshot version of `data`, when the server reports one
+        self.version = None
+
+    def reset_validators(self):
+        self._etag = self._last_modified = self._digest = None
+        self.version = None
+
+    def tag_id(self, t_id):
+        return f"{self.name}-{t_id}" if self.name else t_id
+
+    def tag_item(self, item):
+        if not self.name:
+            return item
+        return dict(item, table_id=self.tag_id(item.get('table_id')), venue=self.name)
+
+    def tag(self, data):
+        if not self.name:
+            return data
+        return dict(data, live_status=[self.tag_item(item) for item in data.get('live_status', [])])
+
+    def _request_headers(self):
+        headers = {}
+        if self.wire_format == "columnar":
+            headers["Accept"] = f"{COLUMNAR_CONTENT_TYPE}, application/json;q=0.9"
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        elif self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+        return headers
+
+    def _request_path(self):
+        path = request_path(self.endpoint)
+        if self.version is None or self.data is None:
+            return path
+        return f"{path}{'&' if '?' in path else '?'}since={urllib.parse.quote(str(self.version))}"
+
+    def _apply_delta(self, delta):
+        """Folds a delta into `data`; None when it does not follow our version."""
+        if self.data is None or delta.get('since') != self.version:
+            return None
+        upserts = {}
+        for item in delta.get('upserts', []):
+            item = self.tag_item(item)
+            upserts[item.get('table_id')] = item
+        deletes = {self.tag_id(t_id) for t_id in delta.get('deletes', [])}
+        # Copy-on-write: published data dicts are shared and never mutated
+        live_status = []
+        for item in self.data.get('live_status', []):
+            t_id = item.get('table_id')
+            if t_id not in deletes:
+                live_status.append(upserts.pop(t_id, item))
+        live_status.extend(item for t_id, item in upserts.items() if t_id not in deletes)
+        return dict(self.data, analytics=delta.get('analytics', self.data.get('analytics', {})),
+                    live_status=live_status, version=delta.get('version'))
+
+    def poll_once(self):
+        """Fetches the endpoint once; returns True when `data` changed. A 304,
+        or a body identical to the previous one, is not parsed again."""
+        # One GET on the warm socket decides both online state and data
+        client = get_http_client(self.endpoint)
+        previous = self.data
+        is_online, changed = False, False
+        try:
+            with metrics.timer("fetch"):
+                status, headers, body = client.request(
+                    "GET", self._request_path(), self._request_headers()
+                )
+            metrics.incr("polls")
+            if status == 304:
+                is_online = True
+                metrics.incr("polls_not_modified")
+            elif status == 200:
+                is_online = True
+                metrics.incr("bytes_received", client.last_wire_bytes)
+                self._etag = headers.get("ETag")
+                self._last_modified = headers.get("Last-Modified")
+                digest = hashlib.blake2b(body, digest_size=16).digest()
+                if digest != self._digest or previous is None:
+                    with metrics.timer("parse"):
+                        parsed = decode_payload(body, headers.get("Content-Type"))
+                    if isinstance(parsed, dict) and parsed.get('delta'):
+                        data = self._apply_delta(parsed)
+                        if data is None:
+                            # Version gap: drop the cursor and fetch a full snapshot now
+                            metrics.incr("delta_resyncs")
+                            asked = self.version is not None
+                            self.reset_validators()
+                            return self.poll_once() if asked else False
+                        metrics.incr("delta_polls")
+                        self.data, changed = data, True
+                        self._digest = digest
+                        self.version = parsed.get('version')
+                    elif isinstance(parsed, dict):
+                        self.data, changed = self.tag(parsed), True
+                        self._digest = digest
+                        self.version = parsed.get('version')
+                else:
+                    metrics.incr("polls_not_modified")
+            else:
+                metrics.incr(f"http_{status}")
+        except Exception as e:
+            metrics.error("poll", e)
+        self.online = is_online
+        self.latency = client.last_latency if is_online else None
+        return changed
+
+class DataHub:
+    """Polls once per process and fans every snapshot out to the page sessions."""
+
+    def __init__(self, endpoint, scheduler=None, push_url=PUSH_ENDPOINT, history=None, analytics=None,
+                 cache=None, venues=None):
+        self.endpoint = endpoint
+        # (name, data endpoint) pairs; by default the single unnamed `endpoint`
+        self.venues = [VenueFeed(name, url) for name, url in venues] if venues else [VenueFeed("", endpoint)]
+        self._pool = None
+        self._in_flight = {}
+        self.scheduler = scheduler or AdaptiveScheduler()
+        self.push_url = push_url
+        self.history = history
+        self.analytics = analytics
+        self.cache = cache
+        # Decoded floor; every snapshot handed to the sessions carries it as "tables"
+        self.tables = TableStore()
+        self._push_retry_at = 0
+        self._persisted_at = 0
+        # Warm start: when the shown data came from the cache, the time it was saved
+        self._stale_since = None
+        self._cached_at = 0
+        self._cached_data = None
+        # Trends from the local history, worked out off the event loop and read
+        # by every session: calls per hour for servers without analytics['hourly'],
+        # and hourly KPI means for the shift
+        self.hourly_calls = {}
+        self.shift_trend = {}
+        self._trends_key = None
+        self.latest = None
+        self._subscribers = {}
+        self._next_token = 0
+        self._task = None
+
+    def register(self, callback):
+        self._next_token += 1
+        token = self._next_token
+        self._subscribers[token] = callback
+        metrics.set("sessions", len(self._subscribers))
+        if self.latest is None and self.cache is not None:
+            self._warm_start()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        # A late joiner paints the last snapshot instead of waiting a full cycle
+        latest = self.latest
+        if latest is not None:
+            self._deliver(callback, dict(latest, changed=latest["data"] is not None, alerts=[]))
+        return token
+
+    def unregister(self, token):
+        self._subscribers.pop(token, None)
+        metrics.set("sessions", len(self._subscribers))
+        if not self._subscribers and self._task is not None:
+            # Last session left; the next register() restarts polling
+            self._task.cancel()
+            self._task = None
+
+    def session_count(self):
+        return len(self._subscribers)
+
+    def _warm_start(self):
+        """Seeds `latest` with the cached floor, flagged stale until the server answers."""
+        cached = self.cache.load()
+        if cached is None:
+            return
+        data, saved_at = cached
+        # Seed only the table store, for painting; the analytics and history
+        # wait for the server, since the cached states may be hours old
+        self.tables.update(data.get('live_status') or [], saved_at)
+        if len(self.venues) == 1:
+            self.venues[0].data = data
+        else:
+            # Hand every venue its own slice, so a venue that stays down keeps its tables
+            venue_analytics = data.get('venue_analytics', {})
+            for venue in self.venues:
+                venue.data = {
+                    "analytics": venue_analytics.get(venue.name, {}),
+                    "live_status": [item for item in data.get('live_status', []) if item.get('venue') == venue.name],
+                }
+        self._stale_since = saved_at
+        self._cached_data = data
+        self.latest = {
+            "online": False,
+            "data": data,
+            "changed": True,
+            "received_at": saved_at,
+            "latency": None,
+            "poll_interval": None,
+            "stale_since": saved_at,
+            "tables": self.tables,
+        }
+
+    def poll_once(self):
+        """Fetches every venue concurrently and returns the combined snapshot;
+        a venue slower than VENUE_TIMEOUT keeps its last data."""
+        if len(self.venues) == 1:
+            venue = self.venues[0]
+            changed = venue.poll_once()
+            return {
+                "online": venue.online,
+                "data": venue.data,
+                "changed": changed,
+                "received_at": time.time(),
+                "latency": venue.latency,
+                "venues": None,
+            }
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=VENUE_CONCURRENCY, thread_name_prefix="venue")
+        submitted = []
+        for venue in self.venues:
+            if venue not in self._in_flight:
+                self._in_flight[venue] = self._pool.submit(venue.poll_once)
+                submitted.append(self._in_flight[venue])
+        # Only this cycle's fetches are waited for; a venue already known to be
+        # slow is picked up whenever it returns
+        concurrent.futures.wait(submitted, timeout=VENUE_TIMEOUT)
+        changed = False
+        for venue, future in list(self._in_flight.items()):
+            if future.done():
+                del self._in_flight[venue]
+                changed = future.result() or changed
+        previous = self.latest["data"] if self.latest else None
+        data = self._merge_venues() if changed or previous is None else previous
+        online = [venue.latency for venue in self.venues if venue.online and venue not in self._in_flight]
+        return {
+            "online": bool(online),
+            "data": data,
+            "changed": changed,
+            "received_at": time.time(),
+            "latency": max(online) if online else None,
+            "venues": tuple(
+                (venue.name, "slow" if venue in self._in_flight else "online" if venue.online else "offline")
+                for venue in self.venues
+            ),
+        }
+
+    def _merge_venues(self):
+        live_status, venue_analytics = [], {}
+        for venue in self.venues:
+            if venue.data is not None:
+                live_status.extend(venue.data.get('live_status') or [])
+                venue_analytics[venue.name] = venue.data.get('analytics') or {}
+        return {
+            "analytics": merge_analytics(list(venue_analytics.values())),
+            "venue_analytics": venue_analytics,
+            "live_status": live_status,
+        }
+
+    async def _run(self):
+        while self._subscribers:
+            if self.push_url and len(self.venues) == 1 and time.monotonic() >= self._push_retry_at:
+                # Returns once the stream is unavailable or drops; polling covers the gap
+                await self._consume_push()
+            delay = self.scheduler.current_interval
+            try:
+                snapshot = await asyncio.to_thread(self.poll_once)
+                self._decode(snapshot)
+                delay = self.scheduler.next_delay(snapshot, self.tables.count("Customer_Called") > 0)
+                snapshot["poll_interval"] = self.scheduler.current_interval
+                metrics.set("poll_mode", getattr(self.scheduler, "mode", None))
+                self._fan_out(snapshot)
+                await self._persist_history()
+                await self._refresh_trends()
+                await self._save_snapshot()
+            except Exception as e:
+                # Bad data from one cycle must not stop polling for every session
+                metrics.error("hub", e)
+            await asyncio.sleep(delay)
+
+    async def _consume_push(self):
+        connected = False
+        try:
+            async for event, payload in iter_sse_events(self.push_url):
+                connected = True
+                metrics.incr("push_events")
+                data = self._apply_push_event(event, json.loads(payload))
+                if data is not None:
+                    self.venues[0].data = data
+                    self._publish({
+                        "online": True,
+                        "data": data,
+                        "changed": True,
+                        "received_at": time.time(),
+                        "latency": None,
+                        "poll_interval": None,
+                        "venues": None,
+                    })
+                    await self._persist_history()
+                    await self._refresh_trends()
+                    await self._save_snapshot()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.error("push", e)
+        if connected:
+            # Pushed patches moved the data on; the next poll must be a full fetch
+            self.venues[0].reset_validators()
+        # A stream that worked is retried right after one fallback poll;
+        # one that never came up is left alone for PUSH_RETRY_INTERVAL
+        self._push_retry_at = time.monotonic() + (0 if connected else PUSH_RETRY_INTERVAL)
+
+    def _apply_push_event(self, event, payload):
+        """Folds one pushed event into the current data; returns the new data
+        dict, or None when the event does not change what the views show."""
+        current = self.latest["data"] if self.latest else None
+        venue = self.venues[0]
+        if event == "snapshot":
+            return venue.tag(payload) if isinstance(payload, dict) else None
+        if current is None:
+            return None  # nothing to patch until the first full snapshot
+        if event == "analytics":
+            return dict(current, analytics=payload)
+        if event == "table":
+            # Upsert (or delete) one table, keeping the floor order stable
+            payload = venue.tag_item(payload)
+            t_id = payload.get('table_id')
+            live_status = list(current.get('live_status', []))
+            for i, item in enumerate(live_status):
+                if item.get('table_id') == t_id:
+                    if payload.get('deleted'):
+                        del live_status[i]
+                    else:
+                        live_status[i] = payload
+                    break
+            else:
+                if not payload.get('deleted'):
+                    live_status.append(payload)
+            return dict(current, live_status=live_status)
+        return None
+
+    async def _persist_history(self):
+        if self.history is None or not self.history.has_pending():
+            return
+        if time.monotonic() - self._persisted_at >= HISTORY_PERSIST_INTERVAL:
+            self._persisted_at = time.monotonic()
+            with metrics.timer("persist"):
+                await asyncio.to_thread(self.history.persist)
+
+    async def _refresh_trends(self):
+        data = self.latest["data"] if self.latest else None
+        if self.history is None or data is None:
+            return
+        # Once per new transition, or per minute so the hour buckets roll on
+        key = (self.history.transition_count, int(time.time() // 60))
+        if key != self._trends_key:
+            self._trends_key = key
+            # May run GROUP BYs under the history's database lock
+            server_hourly = bool((data.get('analytics') or {}).get('hourly'))
+            self.hourly_calls, self.shift_trend = await asyncio.to_thread(self._trends, server_hourly)
+
+    def _trends(self, server_hourly):
+        since = (time.time() // 3600 - SHIFT_TREND_HOURS + 1) * 3600
+        shift = {field: self.history.kpi_series(field, since, 3600) for field in ("called", "avg_resp")}
+        return ({} if server_hourly else self.history.hourly_calls()), shift
+
+    async def _save_snapshot(self):
+        if self.cache is None or self._stale_since is not None or self.latest is None:
+            return
+        data = self.latest["data"]
+        if data is None or data is self._cached_data:
+            return
+        if time.monotonic() - self._cached_at >= SNAPSHOT_SAVE_INTERVAL:
+            self._cached_at = time.monotonic()
+            self._cached_data = data
+            # Data dicts are replaced, never mutated, so the worker can serialise this one
+            await asyncio.to_thread(self.cache.save, data, self.latest["received_at"])
+
+    def _publish(self, snapshot):
+        self._decode(snapshot)
+        self._fan_out(snapshot)
+
+    def _decode(self, snapshot):
+        if snapshot["changed"] and snapshot["online"] and self._stale_since is not None:
+            # First fresh floor after a warm start: diff it from scratch, so the
+            # cache-to-now differences are not taken for calls and responses
+            self.tables.forget()
+            self._stale_since = None
+        snapshot["stale_since"] = self._stale_since
+        snapshot["tables"] = self.tables
+        if snapshot["changed"] and snapshot["data"] is not None:
+            # One decoding pass per snapshot feeds the views, the history and the analytics
+            with metrics.timer("decode"):
+                transitions = self.tables.update(snapshot["data"].get('live_status') or [], snapshot["received_at"])
+                if self.history is not None:
+                    self.history.record(snapshot["data"], snapshot["received_at"], self.tables, transitions)
+                if self.analytics is not None:
+                    self.analytics.apply(transitions, snapshot["received_at"])
+            metrics.incr("transitions", len(transitions))
+            # Tables that just started calling take the sessions' fast path
+            snapshot["alerts"] = [t_id for t_id, old, new, _ in transitions
+                                  if new == "Customer_Called" and old is not None]
+            metrics.incr("alerts", len(snapshot["alerts"]))
+
+    def _fan_out(self, snapshot):
+        previous = self.latest
+        self.latest = snapshot
+        metrics.set("online", snapshot["online"])
+        metrics.set("poll_interval", snapshot["poll_interval"] or 0)
+        # Quiet cycle: same data, same online state, same rate -> nothing to fan out
+        if (snapshot["changed"] or previous is None or previous["online"] != snapshot["online"]
+                or previous["poll_interval"] != snapshot["poll_interval"]
+                or previous["stale_since"] != snapshot["stale_since"]
+                or previous.get("venues") != snapshot.get("venues")):
+            with metrics.timer("fanout"):
+                for callback in list(self._subscribers.values()):
+                    self._deliver(callback, snapshot)
+
+    def _deliver(self, callback, snapshot):
+        try:
+            callback(snapshot)
+        except Exception as e:
+            # One broken session must not stall the others
+            metrics.error("render", e)
+
+data_hub = DataHub(
+    DATA_ENDPOINT,
+    venues=[(name, f"{url}/data") for name, url in VENUES],
+    # Push streams are per server; several venues are polled concurrently instead
+    push_url=f"{VENUES[0][1]}/events" if len(VENUES) == 1 else None,
+    history=history_store,
+    analytics=analytics_engine,
+    cache=SnapshotCache(SNAPSHOT_CACHE_PATH, venues=VENUES) if SNAPSHOT_CACHE_PATH else None,
+)
+
+@functools.lru_cache(maxsize=2)
+def clock_text(minute):
+    """Header clock for an epoch minute; formatted once per minute for all sessions."""
+    return datetime.datetime.fromtimestamp(minute * 60).strftime("%a, %d %b • %I:%M %p")
+
+class TimerService:
+    """Process-wide periodic callbacks, aligned to wall-clock multiples of each period
+    so all subscribers of a period share one wake-up."""
+
+    def __init__(self):
+        self._subscribers = {}  # period -> {token: callback}
+        self._fired = {}        # period -> index of the last boundary fired
+        self._next_token = 0
+        self._task = None
+
+    def subscribe(self, period, callback):
+        self._next_token += 1
+        token = (period, self._next_token)
+        if period not in self._subscribers:
+            self._subscribers[period] = {}
+            self._fired[period] = int(time.time() // period)
+        self._subscribers[period][token] = callback
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return token
+
+    def unsubscribe(self, token):
+        period = token[0]
+        callbacks = self._subscribers.get(period, {})
+        callbacks.pop(token, None)
+        if not callbacks:
+            self._subscribers.pop(period, None)
+            self._fired.pop(period, None)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while self._subscribers:
+            now = time.time()
+            wake_at = min((int(now // period) + 1) * period for period in self._subscribers)
+            # A few ms past the boundary, so the tick formats the new minute
+            await asyncio.sleep(wake_at - now + 0.005)
+            now = time.time()
+            for period, callbacks in list(self._subscribers.items()):
+                boundary = int(now // period)
+                if boundary <= self._fired.get(period, boundary):
+                    continue
+                self._fired[period] = boundary
+                with metrics.timer(f"timer_{period:g}s"):
+                    for callback in list(callbacks.values()):
+                        try:
+                            callback(now)
+                        except Exception as e:
+                            metrics.error("timer", e)
+
+timer_service = TimerService()
+
+def _approx_size(obj):
+    # Shallow size of an object, its attribute dict and the containers in it
+    size = sys.getsizeof(obj)
+    attrs = getattr(obj, "__dict__", None)
+    if attrs is not None:
+        size += sys.getsizeof(attrs)
+        size += sum(sys.getsizeof(v) for v in attrs.values() if isinstance(v, (dict, list)))
+    return size
+
+class SessionRuntime:
+    """What one page session owns (hub subscription, timers), released together by close()."""
+
+    def __init__(self, registry, page):
+        self.registry = registry
+        self.page = page
+        self.id = page.session_id
+        self.created = self.last_active = time.monotonic()
+        self.timers = []
+        self.handles = set()
+        self.hub = None
+        self.hub_token = None
+        self.on_idle = None  # called after an idle close, e.g. to show a resume screen
+        self.closed = False
+        self.close_reason = None
+
+    def subscribe(self, hub, callback):
+        self.hub, self.hub_token = hub, hub.register(callback)
+
+    def every(self, period, callback):
+        self.timers.append(timer_service.subscribe(period, callback))
+
+    def later(self, delay, callback):
+        """Runs `callback()` once after `delay` seconds, unless the session closes first."""
+        def fire():
+            self.handles.discard(handle)
+            try:
+                callback()
+            except Exception as e:
+                metrics.error("timer", e)
+        handle = asyncio.get_running_loop().call_later(delay, fire)
+        self.handles.add(handle)
+        return handle
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def close(self, reason):
+        if self.closed:
+            return False
+        self.closed, self.close_reason = True, reason
+        if self.hub is not None:
+            self.hub.unregister(self.hub_token)
+            self.hub = None
+        for token in self.timers:
+            timer_service.unsubscribe(token)
+        self.timers.clear()
+        for handle in self.handles:
+            handle.cancel()
+        self.handles.clear()
+        self.registry._forget(self)
+        metrics.incr(f"sessions_closed_{reason}")
+        if reason == "idle" and self.on_idle is not None:
+            self.on_idle()
+        return True
+
+    def footprint(self):
+        controls = list(self.page.index.values())
+        return {
+            "session": self.id,
+            "age_s": round(time.monotonic() - self.created),
+            "idle_s": round(time.monotonic() - self.last_active),
+            "timers": len(self.timers) + len(self.handles),
+            "controls": len(controls),
+            "approx_kb": round(sum(_approx_size(c) for c in controls) / 1024, 1),
+        }
+
+class SessionRegistry:
+    """Live page sessions of this process, with an optional idle reaper."""
+
+    def __init__(self, idle_timeout=SESSION_IDLE_TIMEOUT, reap_interval=SESSION_REAP_INTERVAL):
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self.sessions = {}
+        self._reaper = None
+
+    def open(self, page):
+        previous = self.sessions.get(page.session_id)
+        if previous is not None:
+            previous.close("replaced")
+        runtime = SessionRuntime(self, page)
+        self.sessions[runtime.id] = runtime
+        if self.idle_timeout and (self._reaper is None or self._reaper.done()):
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+        self._update_gauges()
+        return runtime
+
+    def _forget(self, runtime):
+        if self.sessions.get(runtime.id) is runtime:
+            del self.sessions[runtime.id]
+        if not self.sessions and self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        self._update_gauges()
+
+    def reap_idle(self, now=None):
+        """Closes sessions without input for idle_timeout; returns how many."""
+        now = now or time.monotonic()
+        idle = [s for s in self.sessions.values() if now - s.last_active >= self.idle_timeout]
+        for runtime in idle:
+            runtime.close("idle")
+        return len(idle)
+
+    async def _reap(self):
+        while self.sessions:
+            await asyncio.sleep(self.reap_interval)
+            self.reap_idle()
+            self._update_gauges()
+
+    def _update_gauges(self):
+        metrics.set("sessions_live", len(self.sessions))
+        metrics.set("threads", threading.active_count())
+
+    def report(self):
+        sessions = [runtime.footprint() for runtime in self.sessions.values()]
+        return {
+            "sessions": len(sessions),
+            "threads": threading.active_count(),
+            "approx_kb_per_session": round(sum(s["approx_kb"] for s in sessions) / len(sessions), 1) if sessions else 0,
+            "per_session": sessions,
+        }
+
+session_registry = SessionRegistry()
 
 # ==========================================
-# 3. UI COMPONENTS
+# 5. UI COMPONENTS
 # ==========================================
 Icons = ft.icons
 
-def get_status_badge(is_online):
+def get_status_badge(is_online, poll_interval=None, stale_since=None):
     color = COLOR_SUCCESS if is_online else COLOR_DANGER
     text = "SYSTEM ONLINE" if is_online else "SYSTEM OFFLINE"
     icon = Icons.WIFI if is_online else Icons.WIFI_OFF
+    # No poll interval while online means updates are pushed by the server
+    if stale_since:
+        # Warm start: the floor on screen is the cached one until the server answers
+        color, text, icon = COLOR_WARNING, "CACHED DATA", Icons.HISTORY
+        tooltip = f"Last known floor from {datetime.datetime.fromtimestamp(stale_since).strftime('%a %I:%M %p')}"
+    elif poll_interval:
+        tooltip = f"{'Refreshing' if is_online else 'Retrying'} every {poll_interval:g}s"
+    else:
+        tooltip = "Live updates" if is_online else None
 
     return ft.Container(
+        tooltip=tooltip,
         content=ft.Row([
             ft.Icon(icon, size=16, color="white"),
             ft.Text(text, size=12, weight="bold", color="white")
@@ -84,7 +1595,35 @@ def get_status_badge(is_online):
         animate=ft.Animation(300, "easeInOut")
     )
 
-def kpi_card(title, icon_name, value_ref, color):
+def format_shift_trend(trend):
+    # "Last 8h • calling 09 AM 1.2 · 10 AM 0.8 | resp 09 AM 2.3m ..." from DataHub.shift_trend
+    def hours(series, unit=""):
+        return " · ".join(
+            f"{datetime.datetime.fromtimestamp(start).strftime('%I %p')} {value:.1f}{unit}" for start, value in series)
+    parts = []
+    if trend.get("called"):
+        parts.append(f"calling {hours(trend['called'])}")
+    if trend.get("avg_resp"):
+        parts.append(f"resp {hours(trend['avg_resp'], 'm')}")
+    return f"Last {SHIFT_TREND_HOURS}h, hourly avg • {' | '.join(parts)}" if parts else ""
+
+def get_venue_health(venues):
+    """One small chip per venue (multi-venue mode only); `venues` holds (name, state)."""
+    colors = {"online": COLOR_SUCCESS, "slow": COLOR_WARNING, "offline": COLOR_DANGER}
+    return ft.Row([
+        ft.Container(
+            tooltip=f"{name}: {state}",
+            content=ft.Row([
+                ft.Container(width=8, height=8, border_radius=4, bgcolor=colors.get(state, COLOR_SECONDARY)),
+                ft.Text(name, size=11, weight="w600", color=COLOR_TEXT_MAIN)
+            ], spacing=4, tight=True),
+            bgcolor=COLOR_SURFACE,
+            padding=ft.padding.symmetric(horizontal=8, vertical=4),
+            border_radius=12
+        ) for name, state in venues or ()
+    ], spacing=6, wrap=True)
+
+def kpi_card(title, icon_name, value_ref, color, detail_ref=None):
     return ft.Container(
         content=ft.Column([
             ft.Row([
@@ -97,7 +1636,8 @@ def kpi_card(title, icon_name, value_ref, color):
                 ft.Text(title, size=14, color=COLOR_TEXT_MUTED, weight="w600")
             ], spacing=12, alignment="center"),
             ft.Container(height=4),
-            ft.Text("...", ref=value_ref, size=28, weight="bold", color=COLOR_TEXT_MAIN)
+            ft.Text("...", ref=value_ref, size=28, weight="bold", color=COLOR_TEXT_MAIN),
+            ft.Text("", ref=detail_ref, size=12, color=COLOR_TEXT_MUTED, visible=detail_ref is not None)
         ]),
         bgcolor=COLOR_SURFACE,
         padding=20,
@@ -107,44 +1647,281 @@ def kpi_card(title, icon_name, value_ref, color):
         animate=ft.Animation(400, "easeOut"),
     )
 
-def detailed_table_row(t_id, status, avail, orders):
-    s_bg = "#F3F4F6"
-    s_col = COLOR_SECONDARY
-    s_icon = Icons.CIRCLE
+def table_status_style(status):
+    # (background, accent colour, icon) for a status pill in the table views
+    if status == "Customer_Called":
+        return "#FEF2F2", COLOR_DANGER, Icons.NOTIFICATIONS_ACTIVE
+    if status == "Waiter_Responded":
+        return "#FFFBEB", COLOR_WARNING, Icons.ROOM_SERVICE
+    if status == "Idle":
+        return "#ECFDF5", COLOR_SUCCESS, Icons.CHECK_CIRCLE
+    return "#F3F4F6", COLOR_SECONDARY, Icons.CIRCLE
 
+def live_tile_style(status):
+    # (background, border colour, icon) for a tile in the live floor grids
     if status == "Customer_Called":
-        s_bg, s_col, s_icon = "#FEF2F2", COLOR_DANGER, Icons.NOTIFICATIONS_ACTIVE
-    elif status == "Waiter_Responded":
-        s_bg, s_col, s_icon = "#FFFBEB", COLOR_WARNING, Icons.ROOM_SERVICE
-    elif status == "Idle":
-        s_bg, s_col, s_icon = "#ECFDF5", COLOR_SUCCESS, Icons.CHECK_CIRCLE
-
-    return ft.DataRow(cells=[
-        ft.DataCell(ft.Text(f"T-{t_id}", weight="bold", color=COLOR_TEXT_MAIN, size=14)),
-        ft.DataCell(ft.Container(
-            content=ft.Row([
-                ft.Icon(s_icon, size=14, color=s_col),
-                ft.Text(status.replace("_", " "), size=12, color=s_col, weight="bold")
-            ], spacing=6),
-            bgcolor=s_bg,
+        return "#FEF2F2", COLOR_DANGER, ft.Icons.NOTIFICATIONS_ACTIVE
+    if status == "Waiter_Responded":
+        return "#FFFBEB", COLOR_WARNING, ft.Icons.ROOM_SERVICE
+    return COLOR_SURFACE, "transparent" if status == "Idle" else COLOR_SECONDARY, ft.Icons.CHECK_CIRCLE
+
+class DetailedTableRow:
+    """One `ft.DataRow` of the table views. Built once per table_id and then
+    patched in place, so Flet only sends the cells whose values changed."""
+
+    def __init__(self, state):
+        self.key = None
+        self.id_text = ft.Text(weight="bold", color=COLOR_TEXT_MAIN, size=14)
+        self.status_icon = ft.Icon(size=14)
+        self.status_text = ft.Text(size=12, weight="bold")
+        self.status_pill = ft.Container(
+            content=ft.Row([self.status_icon, self.status_text], spacing=6),
             padding=ft.padding.symmetric(horizontal=10, vertical=4),
             border_radius=6
-        )),
-        ft.DataCell(ft.Text(str(avail), color=COLOR_TEXT_MAIN, size=13)),
-        ft.DataCell(
-            ft.Text(
-                str(orders),
-                weight="bold",
-                size=13,
-                color=COLOR_PRIMARY if str(orders).isdigit() and int(orders) > 0 else COLOR_TEXT_MUTED)
-        ),
-    ])
+        )
+        self.avail_text = ft.Text(color=COLOR_TEXT_MAIN, size=13)
+        self.orders_text = ft.Text(weight="bold", size=13)
+        self.control = self.layout()
+        self.apply(state)
+
+    def layout(self):
+        return ft.DataRow(cells=[
+            ft.DataCell(self.id_text),
+            ft.DataCell(self.status_pill),
+            ft.DataCell(self.avail_text),
+            ft.DataCell(self.orders_text),
+        ])
+
+    def apply(self, state, avail="Yes", orders="0"):
+        # TableStates are immutable, so identity says whether anything moved
+        key = (state, avail, orders)
+        if key == self.key:
+            return False
+        s_bg, s_col, s_icon = table_status_style(state.status)
+        self.id_text.value = state.id_label
+        self.status_icon.name = s_icon
+        self.status_icon.color = s_col
+        self.status_text.value = state.label
+        self.status_text.color = s_col
+        self.status_pill.bgcolor = s_bg
+        self.avail_text.value = str(avail)
+        self.orders_text.value = str(orders)
+        self.orders_text.color = COLOR_PRIMARY if str(orders).isdigit() and int(orders) > 0 else COLOR_TEXT_MUTED
+        self.key = key
+        return True
+
+class LiveTile:
+    """One tile of a live floor grid; small=True for the dashboard card."""
+
+    def __init__(self, state, small=False):
+        self.state = None
+        self.id_text = ft.Text(weight="bold", size=16 if small else 18)
+        self.icon = ft.Icon(size=16 if small else 20)
+        self.status_text = ft.Text(color=COLOR_TEXT_MUTED, size=11 if small else 14, weight="bold")
+        self.ago_text = ft.Text(color=COLOR_TEXT_MUTED, size=10 if small else 12)
+        self.control = ft.Container(
+            content=ft.Column([
+                ft.Row([self.id_text, self.icon], alignment="space_between"),
+                ft.Divider(height=5 if small else 10, color="transparent"),
+                self.status_text,
+                self.ago_text
+            ]),
+            border_radius=12, padding=10 if small else 16,
+            shadow=ft.BoxShadow(blur_radius=4 if small else 5, color="#05000000")
+        )
+        self.apply(state)
+
+    def apply(self, state):
+        if state is self.state:
+            return False
+        bg, brd, icn = live_tile_style(state.status)
+        self.id_text.value = state.id_label
+        self.icon.name = icn
+        self.icon.color = brd
+        self.status_text.value = state.label
+        self.control.bgcolor = bg
+        self.control.border = ft.border.all(1, brd)
+        self.state = state
+        self.refresh(time.time())
+        return True
+
+    def refresh(self, now):
+        """Advances the "min ago" label; returns the Text when it changed."""
+        ago = f"{self.state.minutes_at(now)} min ago"
+        if ago == self.ago_text.value:
+            return None
+        self.ago_text.value = ago
+        return self.ago_text
+
+# Master Log column widths: ID, STATUS, AVAIL, ORDERS
+LOG_COLUMN_WIDTHS = (70, 170, 60, 60)
+
+def log_columns(cells):
+    return ft.Row(
+        [ft.Container(content=cell, width=width) for cell, width in zip(cells, LOG_COLUMN_WIDTHS)],
+        spacing=12,
+    )
+
+class LogRow(DetailedTableRow):
+    """Fixed-height row of the virtualized Master Log; same cells as the table views."""
+
+    def layout(self):
+        return ft.Container(
+            content=log_columns([self.id_text, self.status_pill, self.avail_text, self.orders_text]),
+            height=LOG_ROW_HEIGHT,
+            padding=ft.padding.symmetric(horizontal=12),
+            border=ft.border.only(bottom=ft.BorderSide(0.5, "#E2E8F0")),
+        )
+
+class KeyedControls:
+    """One view per table_id in a list property (GridView.controls, DataTable.rows),
+    patched in place; sync methods return only the controls to send."""
+
+    def __init__(self, owner, attr, factory):
+        self.owner = owner
+        self.attr = attr
+        self.factory = factory
+        self.views = {}
+        self.order = []
+        self.store_version = None
+        self.layout_version = None
+
+    def sync_store(self, store):
+        """Syncs with the whole store; patches only `store.changed` when this
+        view saw the previous version and the layout has not moved since."""
+        incremental = (self.store_version == store.version - 1
+                       and self.layout_version == store.layout_version)
+        self.store_version, self.layout_version = store.version, store.layout_version
+        if not incremental:
+            return self.sync(store.rows)
+        dirty = []
+        for state in store.changed:
+            view = self.views[state.table_id]
+            if view.apply(state):
+                dirty.append(view.control)
+        return dirty
+
+    def refresh(self, now):
+        """Minute tick: returns the controls whose time-based text moved."""
+        dirty = []
+        for view in self.views.values():
+            control = view.refresh(now)
+            if control is not None:
+                dirty.append(control)
+        return dirty
+
+    def sync(self, states):
+        views, order, dirty = {}, [], []
+        for state in states:
+            key = state.table_id
+            view = self.views.get(key)
+            if view is None:
+                view = self.factory(state)
+            elif view.apply(state):
+                dirty.append(view.control)
+            views[key] = view
+            order.append(key)
+        self.views = views
+        if order != self.order:
+            self.order = order
+            setattr(self.owner, self.attr, [views[k].control for k in order])
+            return [self.owner]
+        return dirty
+
+class UpdateBatch:
+    """Per-cycle update transaction: views mark the controls they touched and
+    flush() sends all of them to the client in one page.update() message."""
+
+    def __init__(self, page):
+        self.page = page
+        self.flushes = 0
+        self.last_flush_size = 0
+        self.controls_sent = 0
+        self._dirty = {}
+
+    def mark(self, control):
+        self._dirty[id(control)] = control
+
+    def mark_all(self, controls):
+        for control in controls:
+            self._dirty[id(control)] = control
+
+    def flush(self):
+        # Controls of a view that is not mounted right now have no page to go to
+        controls = [c for c in self._dirty.values() if c.page is not None]
+        self._dirty.clear()
+        self.last_flush_size = len(controls)
+        if not controls:
+            return 0
+        self.page.update(*controls)
+        self.flushes += 1
+        self.controls_sent += len(controls)
+        return len(controls)
+
+class VirtualLog:
+    """Virtualized Master Log: only rows near the viewport exist as controls."""
+
+    def __init__(self):
+        self.states = []
+        self.first_visible = 0
+        self.visible_rows = 15
+        self.window = (0, 0)
+        self.top_spacer = ft.Container(height=0)
+        self.bottom_spacer = ft.Container(height=0)
+        self.rows_column = ft.Column(spacing=0)
+        self.rows = KeyedControls(self.rows_column, "controls", LogRow)
+        self.list_view = ft.ListView(
+            [self.top_spacer, self.rows_column, self.bottom_spacer],
+            expand=True,
+            on_scroll_interval=100,
+        )
+        self.header = ft.Container(
+            content=log_columns([ft.Text(name, weight="bold") for name in ("ID", "STATUS", "AVAIL", "ORDERS")]),
+            bgcolor="#F1F5F9",
+            padding=ft.padding.symmetric(horizontal=12, vertical=12),
+            border_radius=8,
+        )
+
+    def sync(self, store):
+        """Returns the controls that need an update()."""
+        self.states = store.rows
+        return self._render()
+
+    def scroll_to(self, pixels, viewport_height):
+        """Call from on_scroll; returns the controls to update when the built
+        window had to move, else an empty list."""
+        self.first_visible = max(0, int((pixels or 0) // LOG_ROW_HEIGHT))
+        self.visible_rows = int((viewport_height or 0) // LOG_ROW_HEIGHT) + 2
+        start, end = self.window
+        margin = LOG_OVERSCAN // 2
+        # Rebuild only once the viewport runs into the overscan margin
+        if start > 0 and self.first_visible - start < margin:
+            return self._render()
+        if end < len(self.states) and end - (self.first_visible + self.visible_rows) < margin:
+            return self._render()
+        return []
+
+    def _render(self):
+        total = len(self.states)
+        start = max(0, min(self.first_visible, total) - LOG_OVERSCAN)
+        end = min(total, self.first_visible + self.visible_rows + LOG_OVERSCAN)
+        self.window = (start, end)
+        dirty = self.rows.sync(self.states[start:end])
+        top, bottom = start * LOG_ROW_HEIGHT, (total - end) * LOG_ROW_HEIGHT
+        if (self.top_spacer.height, self.bottom_spacer.height) != (top, bottom):
+            self.top_spacer.height = top
+            self.bottom_spacer.height = bottom
+            dirty += [self.top_spacer, self.bottom_spacer]
+        return dirty
 
 # ==========================================
-# 4. MAIN APPLICATION
+# 6. MAIN APPLICATION
 # ==========================================
 
-def main(page: ft.Page):
+async def main(page: ft.Page):
+    start_metrics_server()
+    # Owns this session's subscription and tasks; see on_disconnect below
+    runtime = session_registry.open(page)
     # --- Page Config ---
     page.title = "Restaurant SmartOps"
     page.bgcolor = COLOR_BG
@@ -157,7 +1934,10 @@ def main(page: ft.Page):
     ref_active_needs = ft.Ref[ft.Text]()
     ref_avg_resp = ft.Ref[ft.Text]()
     ref_avg_dlv = ft.Ref[ft.Text]()
+    ref_calls_detail = ft.Ref[ft.Text]()
+    ref_resp_detail = ft.Ref[ft.Text]()
     ref_status_indicator = ft.Ref[ft.Container]()
+    ref_venue_health = ft.Ref[ft.Container]()
     ref_time = ft.Ref[ft.Text]()
 
     # UI Ref for dashboard's table view
@@ -168,16 +1948,40 @@ def main(page: ft.Page):
 
     current_menu_index = {"value": 0}
 
+    # --- Alert Banner (fast path for tables that just called) ---
+    alert_text = ft.Text(size=14, weight="bold", color="white")
+
+    async def dismiss_alert(e):
+        runtime.touch()
+        hide_alert()
+        ui_batch.flush()
+
+    alert_banner = ft.Container(
+        content=ft.Row([ft.Icon(Icons.NOTIFICATIONS_ACTIVE, color="white", size=18), alert_text], spacing=8),
+        bgcolor=COLOR_DANGER,
+        padding=ft.padding.symmetric(horizontal=16, vertical=10),
+        border_radius=12,
+        visible=False,
+        on_click=dismiss_alert,
+        tooltip="Tap to dismiss",
+    )
+    # "until": when the banner goes; "timer": the pending expire_alert call, if any
+    alert_state = {"until": 0, "timer": None}
+
     # --- Header ---
     shared_header = ft.Container(
         content=ft.Column([
             ft.Row([
                 ft.Column([
                     ft.Text("SmartOps", size=24, weight="900", color=COLOR_TEXT_MAIN),
-                    ft.Text(ref=ref_time, value="Connecting...", size=13, color=COLOR_TEXT_MUTED, italic=True)
+                    ft.Text(ref=ref_time, value=clock_text(int(time.time() // 60)), size=13, color=COLOR_TEXT_MUTED, italic=True)
                 ], spacing=2),
-                ft.Container(ref=ref_status_indicator, content=get_status_badge(False))
+                ft.Row([
+                    ft.Container(ref=ref_venue_health, content=get_venue_health(None)),
+                    ft.Container(ref=ref_status_indicator, content=get_status_badge(False))
+                ], spacing=8, vertical_alignment="center", wrap=True)
             ], alignment="space_between", vertical_alignment="center"),
+            alert_banner,
         ]),
         padding=ft.padding.only(left=24, right=24, top=40, bottom=16),
         bgcolor=COLOR_BG,
@@ -250,11 +2054,11 @@ def main(page: ft.Page):
     view_dashboard = ft.Container(
         content=ft.Column([
             ft.Row([
-                kpi_card("Total Calls", ft.icons.CALL, ref_total_calls, COLOR_PRIMARY),
+                kpi_card("Total Calls", ft.icons.CALL, ref_total_calls, COLOR_PRIMARY, ref_calls_detail),
                 kpi_card("Active Needs", ft.icons.LOCAL_FIRE_DEPARTMENT, ref_active_needs, COLOR_DANGER)
             ], spacing=16),
             ft.Row([
-                kpi_card("Avg Response", ft.icons.TIMER, ref_avg_resp, COLOR_WARNING),
+                kpi_card("Avg Response", ft.icons.TIMER, ref_avg_resp, COLOR_WARNING, ref_resp_detail),
                 kpi_card("Avg Delivery", ft.icons.DELIVERY_DINING, ref_avg_dlv, COLOR_SUCCESS)
             ], spacing=16),
             
@@ -334,25 +2138,18 @@ def main(page: ft.Page):
         expand=True
     )
 
-    # 3. Data Table View
-    data_table = ft.DataTable(
-        columns=[
-            ft.DataColumn(ft.Text("ID", weight="bold")),
-            ft.DataColumn(ft.Text("STATUS", weight="bold")),
-            ft.DataColumn(ft.Text("AVAIL", weight="bold")),
-            ft.DataColumn(ft.Text("ORDERS", weight="bold")),
-        ],
-        rows=[],
-        heading_row_color="#F1F5F9",
-        data_row_min_height=45,
-        column_spacing=25,
-        divider_thickness=0.5,
-    )
+    # 3. Data Table View (virtualized: only rows near the viewport are built)
+    master_log = VirtualLog()
+    # Latest status transitions and the hourly shift trend, read from the local history store
+    recent_activity = ft.Column(spacing=2)
+    shift_trend = ft.Text(size=12, color=COLOR_TEXT_MUTED)
     view_list = ft.Container(
         content=ft.Column([
             ft.Text("Master Log", size=20, weight="bold", color=COLOR_TEXT_MAIN),
+            shift_trend,
+            recent_activity,
             ft.Container(
-                content=ft.Row([data_table], scroll=ft.ScrollMode.ADAPTIVE),
+                content=ft.Column([master_log.header, master_log.list_view], spacing=4, expand=True),
                 bgcolor=COLOR_SURFACE,
                 border_radius=16,
                 padding=10,
@@ -365,6 +2162,228 @@ def main(page: ft.Page):
         expand=True
     )
 
+    # 4. Diagnostics View (only reachable when SMARTOPS_DIAGNOSTICS=1)
+    diagnostics_lines = ft.Column(spacing=2, scroll=ft.ScrollMode.AUTO, expand=True)
+    view_diagnostics = ft.Container(
+        content=ft.Column([
+            ft.Text("Diagnostics", size=20, weight="bold", color=COLOR_TEXT_MAIN),
+            diagnostics_lines,
+        ]),
+        padding=24,
+        expand=True
+    )
+
+    # Keyed reconcilers: one control per table_id, patched in place each cycle
+    dashboard_table_rows = KeyedControls(dashboard_data_table, "rows", DetailedTableRow)
+    dashboard_grid_tiles = KeyedControls(dashboard_live_grid, "controls", lambda state: LiveTile(state, small=True))
+    live_grid_tiles = KeyedControls(live_grid, "controls", LiveTile)
+
+    # --- Rendering ---
+    shown_badge = {"value": None}
+    shown_venues = {"value": None}
+    # Last data snapshot and table store; a view is painted from them the moment it becomes visible
+    latest_data = {"value": None}
+    latest_tables = {"value": None}
+
+    # Every refresh goes out as a single page.update() with only the dirty controls
+    ui_batch = UpdateBatch(page)
+
+    def set_text(ref, value):
+        if getattr(ref, "current", None) and ref.current.value != value:
+            ref.current.value = value
+            ui_batch.mark(ref.current)
+
+    async def on_log_scroll(e):
+        runtime.touch()
+        dirty = master_log.scroll_to(e.pixels, e.viewport_dimension)
+        if dirty:
+            ui_batch.mark_all(dirty)
+            ui_batch.flush()
+
+    master_log.list_view.on_scroll = on_log_scroll
+
+    def render_snapshot(snapshot):
+        # Badge shows online state plus the current effective poll rate
+        badge_state = (snapshot["online"], snapshot.get("poll_interval"), snapshot.get("stale_since"))
+        if badge_state != shown_badge["value"] and getattr(ref_status_indicator, "current", None):
+            ref_status_indicator.current.content = get_status_badge(*badge_state)
+            ui_batch.mark(ref_status_indicator.current)
+            shown_badge["value"] = badge_state
+        # Multi-venue: one health chip per venue next to the badge
+        venues = snapshot.get("venues")
+        if venues != shown_venues["value"] and getattr(ref_venue_health, "current", None):
+            ref_venue_health.current.content = get_venue_health(venues)
+            ui_batch.mark(ref_venue_health.current)
+            shown_venues["value"] = venues
+
+        # Unchanged snapshot: skip the whole KPI/chart/table rebuild
+        data = snapshot["data"]
+        first_paint = False
+        if snapshot["changed"] and data is not None:
+            latest_data["value"] = data
+            latest_tables["value"] = snapshot["tables"]
+            # Tier 1 right away: the alert banner and the floor tiles/rows.
+            # Hidden views cost nothing; they catch up in switch_menu()
+            with metrics.timer("render"):
+                if ALERT_BANNER and snapshot.get("alerts"):
+                    show_alert(snapshot["alerts"], snapshot["tables"])
+                render_view(current_menu_index["value"], data, snapshot["tables"])
+            # Tier 2 (KPIs, charts) waits for on_summary_tick, except for the first paint
+            first_paint = pending_summary["value"] is None
+            if not first_paint:
+                pending_summary["value"] = True
+        with metrics.timer("flush"):
+            ui_batch.flush()
+        if snapshot.get("alerts"):
+            # Data in hand to the alert on screen, KPI and chart work excluded
+            metrics.observe("alert_to_screen", time.time() - snapshot["received_at"])
+        if first_paint:
+            # Sent after tier 1, so a failing summary never holds back the floor
+            try:
+                render_summary(current_menu_index["value"], data)
+            finally:
+                ui_batch.flush()
+
+    def show_alert(alerts, tables):
+        labels = [tables.by_id[t_id].id_label for t_id in alerts if t_id in tables.by_id]
+        if not labels:
+            return
+        more = f" (+{len(labels) - 3} more)" if len(labels) > 3 else ""
+        alert_text.value = f"{', '.join(labels[:3])}{more} {'is' if len(labels) == 1 else 'are'} calling"
+        alert_banner.visible = True
+        alert_state["until"] = time.time() + ALERT_BANNER_SECONDS
+        if alert_state["timer"] is None:
+            alert_state["timer"] = runtime.later(ALERT_BANNER_SECONDS, expire_alert)
+        ui_batch.mark(alert_banner)
+
+    def expire_alert():
+        # A newer alert pushed "until" out: wait for the rest of it
+        remaining = alert_state["until"] - time.time()
+        if remaining > 0:
+            alert_state["timer"] = runtime.later(remaining, expire_alert)
+            return
+        alert_state["timer"] = None
+        hide_alert()
+        ui_batch.flush()
+
+    def hide_alert():
+        if alert_banner.visible:
+            alert_banner.visible = False
+            ui_batch.mark(alert_banner)
+
+    # None until the first summary paint; then True while KPIs/charts are behind the data
+    pending_summary = {"value": None}
+
+    def render_view(idx, data, tables):
+        # Tier 1: the floor itself, patched per changed table
+        if data is None:
+            return
+        if idx == 0:
+            ui_batch.mark_all(dashboard_table_rows.sync_store(tables))
+            ui_batch.mark_all(dashboard_grid_tiles.sync_store(tables))
+        elif idx == 1:
+            ui_batch.mark_all(live_grid_tiles.sync_store(tables))
+        elif idx == 2:
+            ui_batch.mark_all(master_log.sync(tables))
+
+    def render_summary(idx, data):
+        # Tier 2: aggregates that can trail the floor by a few seconds
+        if data is None:
+            return
+        pending_summary["value"] = False
+        if idx == 0:
+            render_analytics(data)
+        elif idx == 2:
+            render_activity()
+
+    def on_summary_tick(now):
+        try:
+            if pending_summary["value"]:
+                with metrics.timer("render_summary"):
+                    render_summary(current_menu_index["value"], latest_data["value"])
+        finally:
+            ui_batch.flush()
+
+    def render_diagnostics():
+        snap = metrics.snapshot()
+        sessions = session_registry.report()
+        lines = [
+            f"Uptime {snap['uptime_s']:.0f}s",
+            f"Sessions {sessions['sessions']} • threads {sessions['threads']} • "
+            f"~{sessions['approx_kb_per_session']:.0f} KB/session",
+        ]
+        lines += [f"{name}: {value}" for name, value in sorted(snap["gauges"].items())]
+        lines += [
+            f"{phase}: avg {s['avg_ms']:.2f} ms • max {s['max_ms']:.2f} ms • last {s['last_ms']:.2f} ms ({s['count']})"
+            for phase, s in snap["phases"].items()
+        ]
+        lines += [f"{name}: {n}" for name, n in sorted(snap["counters"].items())]
+        lines += [f"error {name}: {n}" for name, n in sorted(snap["errors"].items())]
+        diagnostics_lines.controls = [
+            ft.Text(line, size=12, color=COLOR_TEXT_MUTED, font_family="monospace") for line in lines
+        ]
+        ui_batch.mark(diagnostics_lines)
+        ui_batch.flush()
+
+    def refresh_ages(idx, now):
+        if idx == 0:
+            ui_batch.mark_all(dashboard_grid_tiles.refresh(now))
+        elif idx == 1:
+            ui_batch.mark_all(live_grid_tiles.refresh(now))
+
+    shown_activity = {"value": None}
+
+    def render_activity():
+        trend = format_shift_trend(data_hub.shift_trend)
+        if shift_trend.value != trend:
+            shift_trend.value = trend
+            ui_batch.mark(shift_trend)
+        if shown_activity["value"] == history_store.transition_count:
+            return
+        shown_activity["value"] = history_store.transition_count
+        recent_activity.controls = [
+            ft.Text(
+                f"{datetime.datetime.fromtimestamp(ts).strftime('%I:%M %p')} • T-{t_id}: "
+                f"{old.replace('_', ' ')} → {new.replace('_', ' ')}",
+                size=12, color=COLOR_TEXT_MUTED
+            )
+            for ts, t_id, old, new in history_store.recent_transitions(5)
+        ]
+        ui_batch.mark(recent_activity)
+
+    def render_analytics(data):
+        # KPIs and charts of the first page. KPIs come from the server's
+        # analytics block, kept fresh by the local analytics engine
+        analytics = data.get('analytics') or {}
+        kpis = analytics_engine.kpis(analytics)
+        set_text(ref_total_calls, str(kpis.get('total', '-')))
+        set_text(ref_active_needs, str(kpis.get('open', '-')))
+        set_text(ref_avg_resp, f"{kpis.get('avg_resp', '0')}m")
+        set_text(ref_avg_dlv, f"{kpis.get('avg_dlv', '0')}m")
+        set_text(ref_calls_detail, f"{analytics_engine.calls_this_hour()} this hour")
+        if kpis['p50_resp'] is not None:
+            set_text(ref_resp_detail, f"p50 {kpis['p50_resp']}m • p95 {kpis['p95_resp']}m")
+
+        # Chart Update (points are patched in place rather than replaced);
+        # without server figures the trend comes from the local history
+        hourly = analytics.get('hourly') or data_hub.hourly_calls
+        for i, point in enumerate(chart_data_points):
+            y = float(hourly.get(str(i), 0))
+            if point.y != y:
+                point.y = y
+                ui_batch.mark(traffic_chart)
+
+        # Pie Update
+        open_c = int(analytics.get('open_count', 0))
+        closed_c = int(analytics.get('closed_count', 0))
+        if open_c + closed_c == 0: open_c = 1 
+        if (availability_chart.sections[0].value, availability_chart.sections[1].value) != (closed_c, open_c):
+            availability_chart.sections[0].value = closed_c
+            availability_chart.sections[0].title = str(closed_c)
+            availability_chart.sections[1].value = open_c
+            availability_chart.sections[1].title = str(open_c)
+            ui_batch.mark(availability_chart)
+
     # Content Area
     body_container = ft.Container(content=view_dashboard, expand=True)
 
@@ -376,16 +2395,31 @@ def main(page: ft.Page):
             body_container.content = view_monitor
         elif idx == 2:
             body_container.content = view_list
-        
+        elif idx == 3:
+            body_container.content = view_diagnostics
+            render_diagnostics()
+
+        # Paint the newly visible view from cache instead of waiting for the next poll
+        render_view(idx, latest_data["value"], latest_tables["value"])
+        render_summary(idx, latest_data["value"])
+        refresh_ages(idx, time.time())
+
         # This is the line that makes the magic happen:
         page.update()
 
+    # Handlers are coroutines so they run on the event loop, like the hub renders
+    async def on_menu_change(e):
+        runtime.touch()
+        switch_menu(e.control.selected_index)
+
     # --- Navigation Definition ---
     menu_items = [
         {"text": "Dashboard", "icon": Icons.DASHBOARD, "idx": 0},
         {"text": "Monitor", "icon": Icons.MONITOR_HEART, "idx": 1},
         {"text": "Data Logs", "icon": Icons.TABLE_CHART, "idx": 2},
     ]
+    if DIAGNOSTICS_PANEL:
+        menu_items.append({"text": "Diagnostics", "icon": Icons.SPEED, "idx": 3})
 
     sidebar_menu = ft.NavigationRail(
         selected_index=0,
@@ -403,7 +2437,7 @@ def main(page: ft.Page):
                 label=item["text"] 
             ) for item in menu_items
         ],
-        on_change=lambda e: switch_menu(e.control.selected_index)
+        on_change=on_menu_change
     )
 
     # Bottom Bar (Mobile)
@@ -414,7 +2448,7 @@ def main(page: ft.Page):
         destinations=[
             ft.NavigationDestination(icon=item["icon"], label=item["text"]) for item in menu_items
         ],
-        on_change=lambda e: switch_menu(e.control.selected_index)
+        on_change=on_menu_change
     )
 
     # --- Safe Responsive Layout ---
@@ -443,7 +2477,11 @@ def main(page: ft.Page):
             )
         page.update()
 
-    page.on_resize = lambda e: build_layout(page.width)
+    async def on_resize(e):
+        runtime.touch()
+        build_layout(page.width)
+
+    page.on_resize = on_resize
     
     # Initial build safe check
     try:
@@ -452,119 +2490,60 @@ def main(page: ft.Page):
     except:
         build_layout(400) # Fallback
 
-    # --- Background Threads ---
-    def update_clock():
-        while app_state["running"]:
-            try:
-                now_str = datetime.datetime.now().strftime("%a, %d %b • %I:%M %p")
-                if getattr(ref_time, "current", None):
-                    ref_time.current.value = now_str
-                    ref_time.current.update()
-                time.sleep(1)
-            except: time.sleep(1)
-
-    def _create_live_grid_controls(live_status, small=False):
-        # Returns a list of containers for a live grid, small=False for main live, True for dashboard card (smaller)
-        con_list = []
-        for item in live_status:
-            status = item.get('status', 'Idle')
-            if status == "Customer_Called":
-                bg, brd, icn = "#FEF2F2", COLOR_DANGER, ft.Icons.NOTIFICATIONS_ACTIVE
-            elif status == "Waiter_Responded":
-                bg, brd, icn = "#FFFBEB", COLOR_WARNING, ft.Icons.ROOM_SERVICE
-            else:
-                bg, brd, icn = COLOR_SURFACE, "transparent", ft.Icons.CHECK_CIRCLE
-                if status != "Idle": brd = COLOR_SECONDARY
-            con_list.append(
-                ft.Container(
-                    content=ft.Column([
-                        ft.Row([ft.Text(f"T-{item.get('table_id')}", weight="bold", size=16 if small else 18), ft.Icon(icn, color=brd, size=16 if small else 20)], alignment="space_between"),
-                        ft.Divider(height=5 if small else 10, color="transparent"),
-                        ft.Text(status.replace("_", " "), color=COLOR_TEXT_MUTED, size=11 if small else 14, weight="bold"),
-                        ft.Text(f"{item.get('minutes_ago', 0)} min ago", color=COLOR_TEXT_MUTED, size=10 if small else 12)
-                    ]),
-                    bgcolor=bg, border=ft.border.all(1, brd), border_radius=12, padding=10 if small else 16,
-                    shadow=ft.BoxShadow(blur_radius=4 if small else 5, color="#05000000")
-                )
+    # --- Background Tasks ---
+    # --- Periodic Work (shared timer service; one wake-up per period for all sessions) ---
+    def on_minute(now):
+        # The header clock and the "min ago" labels only move on minute boundaries
+        set_text(ref_time, clock_text(int(now // 60)))
+        refresh_ages(current_menu_index["value"], now)
+        ui_batch.flush()
+
+    def on_second(now):
+        if current_menu_index["value"] == 3:
+            render_diagnostics()
+
+    runtime.every(60, on_minute)
+    runtime.every(SUMMARY_REFRESH_INTERVAL, on_summary_tick)
+    if DIAGNOSTICS_PANEL:
+        runtime.every(1, on_second)
+    # Data arrives from the process-wide hub rather than a per-page poller
+    runtime.subscribe(data_hub, render_snapshot)
+
+    async def on_resume(e):
+        await main(page)
+
+    def show_paused():
+        # Idle sessions drop their control tree; resuming rebuilds the session
+        page.controls.clear()
+        page.add(
+            ft.Container(
+                content=ft.Column([
+                    ft.Icon(Icons.PAUSE_CIRCLE_OUTLINE, size=48, color=COLOR_TEXT_MUTED),
+                    ft.Text("Paused after inactivity", size=18, weight="bold", color=COLOR_TEXT_MAIN),
+                    ft.FilledButton("Resume", on_click=on_resume),
+                ], horizontal_alignment="center", alignment="center", spacing=12),
+                alignment=ft.alignment.center,
+                expand=True
             )
-        return con_list
+        )
 
-    def fetch_data():
-        while app_state["running"]:
-            try:
-                is_online = check_server_health()
-                app_state["server_online"] = is_online
-
-                if getattr(ref_status_indicator, "current", None):
-                    ref_status_indicator.current.content = get_status_badge(is_online)
-                    ref_status_indicator.current.update()
-
-                if is_online:
-                    data = http_get_json(DATA_ENDPOINT)
-                    if data and isinstance(data, dict):
-                        # 1. Update Dashboard (KPI, charts, and now also table in the first page)
-                        analytics = data.get('analytics', {})
-                        if getattr(ref_total_calls, "current", None):
-                            ref_total_calls.current.value = str(analytics.get('total', '-'))
-                            ref_total_calls.current.update()
-                        if getattr(ref_active_needs, "current", None):
-                            ref_active_needs.current.value = str(analytics.get('open', '-'))
-                            ref_active_needs.current.update()
-                        if getattr(ref_avg_resp, "current", None):
-                            ref_avg_resp.current.value = f"{analytics.get('avg_resp', '0')}m"
-                            ref_avg_resp.current.update()
-                        if getattr(ref_avg_dlv, "current", None):
-                            ref_avg_dlv.current.value = f"{analytics.get('avg_dlv', '0')}m"
-                            ref_avg_dlv.current.update()
-
-                        # Chart Update
-                        hourly = analytics.get('hourly', {})
-                        points = [ft.LineChartDataPoint(i, float(hourly.get(str(i), 0))) for i in range(7)]
-                        traffic_chart.data_series[0].data_points = points
-                        traffic_chart.update()
-
-                        # Pie Update
-                        open_c = int(analytics.get('open_count', 0))
-                        closed_c = int(analytics.get('closed_count', 0))
-                        if open_c + closed_c == 0: open_c = 1 
-                        availability_chart.sections[0].value = closed_c
-                        availability_chart.sections[0].title = str(closed_c)
-                        availability_chart.sections[1].value = open_c
-                        availability_chart.sections[1].title = str(open_c)
-                        availability_chart.update()
-
-                        # Dashboard Table (now live_status table on dashboard too)
-                        live_status = data.get('live_status', [])
-
-                        if getattr(ref_dashboard_table, "current", None):
-                            ref_dashboard_table.current.rows = [
-                                detailed_table_row(i.get('table_id'), i.get('status'), "Yes", "0") for i in live_status
-                            ]
-                            ref_dashboard_table.current.update()
-
-                        # --- NEW: Update dashboard live grid from live_status as well ---
-                        if getattr(ref_dashboard_live_grid, "current", None):
-                            ref_dashboard_live_grid.current.controls = _create_live_grid_controls(live_status, small=True)
-                            ref_dashboard_live_grid.current.update()
-
-                        # 2. Update Live Grid & Table for monitor and log views
-                        if current_menu_index["value"] == 1:
-                            live_grid.controls = _create_live_grid_controls(live_status, small=False)
-                            live_grid.update()
-                        
-                        if current_menu_index["value"] == 2:
-                            data_table.rows = [detailed_table_row(i.get('table_id'), i.get('status'), "Yes", "0") for i in live_status]
-                            data_table.update()
-
-            except Exception as e: 
-                # print(f"Runtime error ignored in thread: {e}") 
-                pass
-            time.sleep(3)
+    runtime.on_idle = show_paused
+
+    async def on_disconnect(e):
+        # Only this session's work stops; other sessions keep their tasks
+        runtime.close("disconnect")
 
-    threading.Thread(target=update_clock, daemon=True).start()
-    threading.Thread(target=fetch_data, daemon=True).start()
+    async def on_connect(e):
+        # A client that reconnects to a closed session gets it rebuilt
+        if runtime.closed:
+            await main(page)
+
+    async def on_close(e):
+        runtime.close("closed")
 
-    def on_disconnect(e):
-        app_state["running"] = False
     page.on_disconnect = on_disconnect
-ft.app(target=main)
\ No newline at end of file
+    page.on_connect = on_connect
+    page.on_close = on_close
+
+if __name__ == "__main__":
+    ft.app(target=main)
\ No newline at end of file